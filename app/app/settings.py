@@ -11,8 +11,13 @@ https://docs.djangoproject.com/en/3.1/ref/settings/
 """
 
 import os
+import tempfile
+from importlib.util import find_spec
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
 
@@ -24,9 +29,11 @@ BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
 SECRET_KEY = 'g@8kmjuea1^natqt#v)h#y)o03yhi&j(p8r6mhy@z2vd-=@y)l'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DEBUG', '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [
+    host for host in os.environ.get('ALLOWED_HOSTS', '').split(',') if host
+]
 
 
 # Application definition
@@ -40,14 +47,17 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
 
     'rest_framework',
+    # Only for core's migration of the legacy tokens
     'rest_framework.authtoken',
 
-    'core',
-    'recipe',
-    'user',
+    'core.apps.CoreConfig',
+    'recipe.apps.RecipeConfig',
+    'user.apps.UserConfig',
+    'benchmark',
 ]
 
 MIDDLEWARE = [
+    'core.metrics.metrics_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,6 +69,21 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'app.urls'
 
+# Per view latency, query and serialization histograms served at
+# /metrics (per process); METRICS_SERVER_TIMING also reports them to the
+# client in a Server-Timing header
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+METRICS_SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', '0') == '1'
+# /metrics only answers clients in METRICS_ALLOWED_NETWORKS (matched
+# against REMOTE_ADDR, loopback by default) or sending METRICS_TOKEN as
+# a bearer token
+METRICS_ALLOWED_NETWORKS = [
+    network for network in os.environ.get(
+        'METRICS_ALLOWED_NETWORKS', '127.0.0.0/8,::1/128'
+    ).split(',') if network
+]
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -81,6 +106,8 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
+DB_CONN_MAX_AGE = os.environ.get('DB_CONN_MAX_AGE', '60')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -88,9 +115,170 @@ DATABASES = {
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # Keep connections open between requests (seconds, 0 closes them
+        # after every request, empty keeps them forever)
+        'CONN_MAX_AGE': int(DB_CONN_MAX_AGE) if DB_CONN_MAX_AGE else None,
+        # Ping reused connections at the start of a request, see core.db
+        'CONN_HEALTH_CHECKS': (
+            os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1'
+        ),
+        # Transaction pooling (pgbouncer pool_mode=transaction) cannot
+        # keep the named cursors behind QuerySet.iterator() open
+        'DISABLE_SERVER_SIDE_CURSORS': (
+            os.environ.get('DB_TRANSACTION_POOLING', '0') == '1'
+        ),
+        # Fail unreachable hosts fast instead of waiting on TCP timeouts
+        'OPTIONS': {
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+        },
     }
 }
 
+# Threads running database work for async views (core.db.db_executor);
+# also the number of connections those views hold per process
+ASYNC_DB_THREADS = int(os.environ.get('ASYNC_DB_THREADS', 16))
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+# The 'api' cache holds serialized list responses and the per-user
+# versions that invalidate them. It defaults to a local memory LRU, which
+# only one process may use: a write bumps the version in its own process
+# alone. docker-compose.yml points API_CACHE_BACKEND/API_CACHE_LOCATION at
+# memcached, and `manage.py serve` turns the cache off (timeout 0) when it
+# starts several workers on the local memory backend.
+
+API_CACHE_BACKEND = os.environ.get(
+    'API_CACHE_BACKEND',
+    'django.core.cache.backends.locmem.LocMemCache'
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'api': {
+        'BACKEND': API_CACHE_BACKEND,
+        'LOCATION': os.environ.get('API_CACHE_LOCATION', 'api'),
+        'TIMEOUT': int(os.environ.get('API_CACHE_TIMEOUT', 300)),
+    },
+}
+
+if API_CACHE_BACKEND.endswith('LocMemCache'):
+    CACHES['api']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.environ.get('API_CACHE_MAX_ENTRIES', 1000)),
+    }
+
+
+# Auth tokens
+# Every sign-in creates a token that expires after AUTH_TOKEN_TTL
+# seconds (0 never); a user keeps at most AUTH_TOKEN_MAX_PER_USER.
+
+AUTH_TOKEN_TTL = int(os.environ.get('AUTH_TOKEN_TTL', 30 * 24 * 3600))
+AUTH_TOKEN_MAX_PER_USER = int(os.environ.get('AUTH_TOKEN_MAX_PER_USER', 10))
+
+# Token authentication cache
+# Tokens are cached in-process for AUTH_TOKEN_CACHE_TTL seconds. Set
+# AUTH_TOKEN_CACHE_ALIAS to a shared cache (e.g. 'api' on memcached) so
+# processes share entries. Every process reads the revocations made by
+# the others from the database every AUTH_REVOCATION_SYNC_INTERVAL
+# seconds.
+
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_TTL', 60))
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', 10000))
+AUTH_TOKEN_CACHE_ALIAS = os.environ.get('AUTH_TOKEN_CACHE_ALIAS')
+AUTH_REVOCATION_SYNC_INTERVAL = float(
+    os.environ.get('AUTH_REVOCATION_SYNC_INTERVAL', 1)
+)
+
+
+# Password hashing
+# PASSWORD_HASHER picks the preferred algorithm: argon2 (argon2-cffi),
+# bcrypt or pbkdf2, by default the strongest one installed. Passwords
+# stored with another listed hasher or with other costs are rehashed
+# on the next sign-in.
+
+PASSWORD_HASHER_PATHS = {
+    'argon2': 'user.hashers.Argon2PasswordHasher',
+    'bcrypt': 'user.hashers.BCryptSHA256PasswordHasher',
+    'pbkdf2': 'user.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS_INSTALLED = [
+    name for name, module in (
+        ('argon2', 'argon2'), ('bcrypt', 'bcrypt'), ('pbkdf2', 'hashlib')
+    ) if find_spec(module)
+]
+PASSWORD_HASHER = os.environ.get(
+    'PASSWORD_HASHER', PASSWORD_HASHERS_INSTALLED[0]
+)
+if PASSWORD_HASHER not in PASSWORD_HASHERS_INSTALLED:
+    raise ImproperlyConfigured(
+        f'PASSWORD_HASHER {PASSWORD_HASHER!r} is not one of the installed '
+        f'{PASSWORD_HASHERS_INSTALLED}'
+    )
+
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_PATHS[name] for name in sorted(
+        PASSWORD_HASHERS_INSTALLED, key=lambda name: name != PASSWORD_HASHER
+    )
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
+PASSWORD_PBKDF2_ITERATIONS = int(
+    os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 216000)
+)
+PASSWORD_ARGON2_TIME_COST = int(
+    os.environ.get('PASSWORD_ARGON2_TIME_COST', 2)
+)
+PASSWORD_ARGON2_MEMORY_COST = int(
+    os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 512)
+)
+PASSWORD_ARGON2_PARALLELISM = int(
+    os.environ.get('PASSWORD_ARGON2_PARALLELISM', 2)
+)
+PASSWORD_BCRYPT_ROUNDS = int(os.environ.get('PASSWORD_BCRYPT_ROUNDS', 12))
+
+# Sign-in password hashing is capped at PASSWORD_HASH_SLOTS at a time
+# across all worker processes on the host, so sign-ins cannot occupy
+# every worker; a sign-in without a slot within PASSWORD_HASH_WAIT
+# seconds is answered with 503
+
+AUTHENTICATION_BACKENDS = ['user.backends.BoundedHashingBackend']
+
+PASSWORD_HASH_SLOTS = int(os.environ.get('PASSWORD_HASH_SLOTS', 2))
+PASSWORD_HASH_WAIT = float(os.environ.get('PASSWORD_HASH_WAIT', 0.5))
+PASSWORD_HASH_LOCK_DIR = os.environ.get(
+    'PASSWORD_HASH_LOCK_DIR',
+    os.path.join(tempfile.gettempdir(), 'recipe-app-hash-slots')
+)
+
+# Sign-in throttling
+# Token buckets of (burst, refill per second) per client IP and per
+# email, checked before any password is hashed. The default 'throttle'
+# cache keeps them in files under LOGIN_THROTTLE_DIR, so all worker
+# processes on the host share them. With several hosts, point
+# LOGIN_THROTTLE_CACHE at a cache they share (e.g. 'api' on memcached);
+# a per-process cache such as 'default' multiplies every limit by the
+# number of workers.
+
+CACHES['throttle'] = {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.environ.get(
+        'LOGIN_THROTTLE_DIR',
+        os.path.join(tempfile.gettempdir(), 'recipe-app-throttle')
+    ),
+    'OPTIONS': {'MAX_ENTRIES': 10000},
+}
+
+LOGIN_THROTTLE_CACHE = os.environ.get('LOGIN_THROTTLE_CACHE', 'throttle')
+LOGIN_THROTTLE_IP = (
+    int(os.environ.get('LOGIN_THROTTLE_IP_BURST', 20)),
+    float(os.environ.get('LOGIN_THROTTLE_IP_RATE', 1)),
+)
+LOGIN_THROTTLE_EMAIL = (
+    int(os.environ.get('LOGIN_THROTTLE_EMAIL_BURST', 5)),
+    float(os.environ.get('LOGIN_THROTTLE_EMAIL_RATE', 0.1)),
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -134,5 +322,64 @@ STATIC_ROOT = '/vol/web/static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/vol/web/media'
 
+# Internal proxy locations mapped to STATIC_ROOT/MEDIA_ROOT; when set the
+# app answers with X-Accel-Redirect and the proxy sends the file
+STATIC_ACCEL_REDIRECT = os.environ.get('STATIC_ACCEL_REDIRECT', '')
+MEDIA_ACCEL_REDIRECT = os.environ.get('MEDIA_ACCEL_REDIRECT', '')
+
+# Recipe image renditions, generated by `manage.py process_image_jobs`
+
+IMAGE_RENDITION_WIDTHS = (320, 640, 1280)
+IMAGE_JOB_MAX_ATTEMPTS = 3
+IMAGE_JOB_TIMEOUT = 300
+
 
 AUTH_USER_MODEL = 'core.User'
+
+# Runs the tests with a fast password hasher
+TEST_RUNNER = 'core.test_runner.FastHashingTestRunner'
+
+
+# Django REST Framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 50)),
+    # orjson backed JSON, byte identical to DRF's. orjson is in
+    # requirements.txt (prebuilt musl wheels, so Alpine needs no Rust); the
+    # stdlib encoder is the fallback when it is missing
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Proxies in front of the app whose X-Forwarded-For is trusted for
+    # client IPs in throttling; with 0 the header is ignored, as a
+    # client could otherwise pick its own throttle key
+    'NUM_PROXIES': int(os.environ.get('API_NUM_PROXIES', 0)),
+}
+
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 500))
+
+API_BULK_MAX_ITEMS = int(os.environ.get('API_BULK_MAX_ITEMS', 5000))
+
+# Text search configuration used for recipe search vectors and queries
+# https://www.postgresql.org/docs/current/textsearch-configuration.html
+SEARCH_CONFIG = os.environ.get('SEARCH_CONFIG', 'english')
+
+# Change journal entries older than this are dropped by
+# `manage.py compact_changes`; older sync tokens get a full snapshot
+SYNC_RETENTION_DAYS = int(os.environ.get('SYNC_RETENTION_DAYS', 30))
+# Journal rows become visible when their transaction commits, not in ID
+# order, so sync tokens stay behind the rows journalled this many
+# seconds ago and those are sent again. Must exceed the time between a
+# journal write and its commit
+SYNC_COMMIT_WINDOW = int(os.environ.get('SYNC_COMMIT_WINDOW', 60))
+
+# PAGE_SIZE is shared by the per-view cursor paginators, so there is
+# deliberately no DEFAULT_PAGINATION_CLASS
+SILENCED_SYSTEM_CHECKS = ['rest_framework.W001']
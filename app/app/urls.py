@@ -13,13 +13,39 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
-from django.urls import include, path
-from django.conf.urls.static import static
+from django.urls import include, path, re_path
 from django.conf import settings
 
+from core.views import healthz, metrics, readyz, serve_file
+
+
+def files(prefix, document_root, accel_prefix):
+    '''Return the URL pattern serving the files below document_root'''
+    return re_path(
+        r'^%s(?P<path>.*)$' % re.escape(prefix.lstrip('/')),
+        serve_file,
+        {'document_root': document_root, 'accel_prefix': accel_prefix}
+    )
+
+
 urlpatterns = [
+    path('healthz', healthz, name='healthz'),
+    path('readyz', readyz, name='readyz'),
+    path('metrics', metrics, name='metrics'),
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    files(
+        settings.STATIC_URL,
+        settings.STATIC_ROOT,
+        settings.STATIC_ACCEL_REDIRECT
+    ),
+    files(
+        settings.MEDIA_URL,
+        settings.MEDIA_ROOT,
+        settings.MEDIA_ACCEL_REDIRECT
+    ),
+]
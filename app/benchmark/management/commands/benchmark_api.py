@@ -0,0 +1,395 @@
+import http.client
+import io
+import json
+import random
+import re
+import statistics
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlencode, urlsplit
+
+from PIL import Image
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from benchmark.utils import percentile, seed_recipes
+from core.models import AuthToken, Ingredient, Recipe, Tag
+
+
+# (name, expected status); reads run before the writes
+SCENARIOS = (
+    ('list', 200),
+    ('detail', 200),
+    ('filter', 200),
+    ('create', 201),
+    ('upload-image', 202),
+)
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+class InProcessClient:
+    '''Send requests through Django's WSGI handler in this process'''
+
+    def __init__(self):
+        self.handler = WSGIHandler()
+
+    def request(self, method, path, body, headers):
+        '''Return the status, Server-Timing header and body of a request'''
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+        }
+        for name, value in headers.items():
+            key = name.upper().replace('-', '_')
+            environ[key if key == 'CONTENT_TYPE' else f'HTTP_{key}'] = value
+
+        started = []
+        response = self.handler(
+            environ, lambda status, headers: started.append((status, headers))
+        )
+        content = b''.join(response)
+        # Closing the response sends request_finished
+        response.close()
+        status, response_headers = started[0]
+
+        return (
+            int(status.split()[0]),
+            dict(response_headers).get('Server-Timing'),
+            content
+        )
+
+
+class HTTPClient:
+    '''Send requests to a running server over one kept-alive connection'''
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        connection_class = (
+            http.client.HTTPSConnection if parts.scheme == 'https'
+            else http.client.HTTPConnection
+        )
+        self.connection = connection_class(parts.netloc, timeout=30)
+        self.prefix = parts.path.rstrip('/')
+
+    def request(self, method, path, body, headers):
+        '''Return the status, Server-Timing header and body of a request'''
+        try:
+            self.connection.request(
+                method, self.prefix + path, body=body, headers=headers
+            )
+            response = self.connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            return None, None, b''
+
+        return response.status, response.getheader('Server-Timing'), content
+
+
+class Command(BaseCommand):
+    '''Django command to load test the recipe API
+
+    Seeds users with recipes, tags and ingredients, then drives the
+    list, detail, filter, create and upload-image endpoints with
+    concurrent clients. Without --url requests go through the WSGI
+    handler in this process; with it they go over HTTP to a server using
+    the same database, which needs METRICS_SERVER_TIMING=1 for query
+    counts. The seeded users and their uploads are deleted afterwards.
+
+    Prints p50/p95/p99 latency, throughput and query counts per
+    scenario as JSON with sorted keys, so runs diff cleanly.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=4,
+            help='Users to seed'
+        )
+        parser.add_argument(
+            '--recipes', type=int, default=1000,
+            help='Recipes per user'
+        )
+        parser.add_argument(
+            '--tags', type=int, default=20,
+            help='Tags per user'
+        )
+        parser.add_argument(
+            '--ingredients', type=int, default=50,
+            help='Ingredients per user'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=500,
+            help='Timed requests per scenario'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=20,
+            help='Untimed requests per scenario'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help='Concurrent clients'
+        )
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            choices=[name for name, expected in SCENARIOS],
+            help='Scenario to run, repeatable; all by default'
+        )
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running server, e.g. http://localhost:8000'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Seed for the data and the request mix'
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the JSON report to this file instead of stdout'
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('--concurrency and --requests must be >= 1')
+
+        selected = options['scenarios'] or [
+            name for name, expected in SCENARIOS
+        ]
+        fixtures = self._seed(options)
+        self.uploads = set()
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=['testserver'], METRICS_SERVER_TIMING=True
+            ):
+                scenarios = {
+                    name: self._scenario(
+                        name, expected, fixtures, options
+                    )
+                    for name, expected in SCENARIOS if name in selected
+                }
+        finally:
+            self._cleanup(fixtures)
+
+        report = {
+            'config': {
+                key: options[key] for key in (
+                    'users', 'recipes', 'tags', 'ingredients', 'requests',
+                    'warmup', 'concurrency', 'seed'
+                )
+            },
+            'database': connection.vendor,
+            'target': options['url'] or 'in-process',
+            'scenarios': scenarios,
+        }
+        body = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(body + '\n')
+        else:
+            self.stdout.write(body)
+
+    def _seed(self, options):
+        '''Create the benchmark users, returning what requests need'''
+        run = uuid.uuid4().hex[:8]
+        start = time.perf_counter()
+        fixtures = []
+        for i in range(options['users']):
+            user = seed_recipes(
+                options['recipes'],
+                f'benchmark-api-{run}-{i}@example.com',
+                n_tags=options['tags'],
+                n_ingredients=options['ingredients'],
+                seed=options['seed'] + i
+            )
+            fixtures.append({
+                'user': user,
+                'token': AuthToken.objects.create_token(user)[1],
+                'recipes': list(
+                    Recipe.objects.filter(user=user)
+                    .values_list('id', flat=True)
+                ),
+                'tags': list(
+                    Tag.objects.filter(user=user).values_list('id', flat=True)
+                ),
+                'ingredients': list(
+                    Ingredient.objects.filter(user=user)
+                    .values_list('id', flat=True)
+                ),
+            })
+        self.stderr.write(
+            f'Seeded {options["users"]} x {options["recipes"]} recipes '
+            f'in {time.perf_counter() - start:.1f} s'
+        )
+
+        return fixtures
+
+    def _cleanup(self, fixtures):
+        '''Delete the benchmark users, their data and uploaded images'''
+        users = [fixture['user'] for fixture in fixtures]
+        # Replaced images are not deleted by the API, so every upload
+        # response was recorded
+        self.uploads.update(
+            Recipe.objects.filter(user__in=users).exclude(image='')
+            .values_list('image', flat=True)
+        )
+        for name in self.uploads:
+            default_storage.delete(name)
+        for user in users:
+            user.delete()
+
+    def _requests(self, name, fixtures, count, rng):
+        '''Return count (method, path, body, headers) for a scenario'''
+        image = io.BytesIO()
+        Image.new('RGB', (64, 64), 'orange').save(image, format='PNG')
+        recipes_url = reverse('recipe:recipe-list')
+        requests = []
+        for i in range(count):
+            fixture = rng.choice(fixtures)
+            headers = {
+                'Accept': 'application/json',
+                'Authorization': f'Token {fixture["token"]}',
+            }
+            method, path, body = 'GET', recipes_url, b''
+            if name == 'detail':
+                path = reverse(
+                    'recipe:recipe-detail',
+                    args=[rng.choice(fixture['recipes'])]
+                )
+            elif name == 'filter':
+                path += '?' + urlencode({
+                    'tags': ','.join(map(str, rng.sample(
+                        fixture['tags'], min(2, len(fixture['tags']))
+                    ))),
+                    'ingredients': rng.choice(fixture['ingredients']),
+                })
+            elif name == 'create':
+                method = 'POST'
+                headers['Content-Type'] = 'application/json'
+                body = json.dumps({
+                    'title': f'Benchmark recipe {i}',
+                    'time_minutes': rng.randint(5, 120),
+                    'price': f'{rng.randint(100, 9999) / 100:.2f}',
+                    'tags': rng.sample(fixture['tags'], 1),
+                    'ingredients': rng.sample(fixture['ingredients'], 1),
+                }).encode()
+            elif name == 'upload-image':
+                method = 'POST'
+                path = reverse(
+                    'recipe:recipe-upload-image',
+                    args=[rng.choice(fixture['recipes'])]
+                )
+                headers['Content-Type'] = MULTIPART_CONTENT
+                body = encode_multipart(BOUNDARY, {
+                    'image': ContentFile(image.getvalue(), name='bench.png')
+                })
+            requests.append((method, path, body, headers))
+
+        return requests
+
+    def _record_upload(self, content):
+        '''Remember the storage name of an uploaded image'''
+        url = json.loads(content)['image']
+        path = unquote(urlsplit(url).path)
+        self.uploads.add(path[len(settings.MEDIA_URL):])
+
+    def _client(self, url):
+        return HTTPClient(url) if url else InProcessClient()
+
+    def _run(self, requests, options):
+        '''Send requests from concurrent clients, returning the results
+
+        Each result is (seconds, status, Server-Timing header).
+        '''
+        concurrency = min(options['concurrency'], len(requests)) or 1
+
+        def work(chunk):
+            client = self._client(options['url'])
+            results = []
+            try:
+                for method, path, body, headers in chunk:
+                    start = time.perf_counter()
+                    status, timing, content = client.request(
+                        method, path, body, headers
+                    )
+                    results.append((time.perf_counter() - start, status,
+                                    timing))
+                    if path.endswith('/upload-image/') and status == 202:
+                        self._record_upload(content)
+            finally:
+                if concurrency > 1:
+                    # Worker threads own their connections
+                    connections.close_all()
+
+            return results
+
+        if concurrency == 1:
+            return work(requests)
+        with ThreadPoolExecutor(concurrency) as pool:
+            chunks = pool.map(
+                work, [requests[i::concurrency] for i in range(concurrency)]
+            )
+
+            return [result for chunk in chunks for result in chunk]
+
+    def _scenario(self, name, expected, fixtures, options):
+        '''Run one scenario and return its summary'''
+        rng = random.Random(f'{options["seed"]}:{name}')
+        if options['warmup']:
+            self._run(
+                self._requests(name, fixtures, options['warmup'], rng),
+                options
+            )
+        requests = self._requests(name, fixtures, options['requests'], rng)
+        start = time.perf_counter()
+        results = self._run(requests, options)
+        elapsed = time.perf_counter() - start
+        self.stderr.write(f'{name}: {len(results)} requests')
+
+        latencies = sorted(seconds * 1000 for seconds, s, t in results)
+        queries = sorted(
+            int(match.group(1)) for match in (
+                SERVER_TIMING_QUERIES.search(timing or '')
+                for seconds, status, timing in results
+            ) if match
+        )
+        statuses = {}
+        for seconds, status, timing in results:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+        return {
+            'requests': len(results),
+            'errors': len(results) - statuses.get(str(expected), 0),
+            'statuses': statuses,
+            'throughput_rps': round(len(results) / elapsed, 1),
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50), 3),
+                'p95': round(percentile(latencies, 95), 3),
+                'p99': round(percentile(latencies, 99), 3),
+                'mean': round(statistics.mean(latencies), 3),
+                'max': round(latencies[-1], 3),
+            },
+            'queries': {
+                'p50': percentile(queries, 50),
+                'p99': percentile(queries, 99),
+                'max': queries[-1],
+            } if queries else None,
+        }
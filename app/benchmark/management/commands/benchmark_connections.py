@@ -0,0 +1,127 @@
+import io
+import statistics
+import sys
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core.models import AuthToken, Recipe
+
+
+# (label, CONN_MAX_AGE, CONN_HEALTH_CHECKS); the first is the baseline
+MODES = (
+    ('connection per request', 0, False),
+    ('persistent', None, False),
+    ('persistent + health checks', None, True),
+)
+
+
+class Command(BaseCommand):
+    '''Django command to time API requests with and without persistent
+    database connections
+
+    Requests go through the full WSGI handler, so Django's request
+    signals open, health check and close connections as in production.
+    A temporary user and recipe are created and deleted afterwards.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Requests to time per mode'
+        )
+        parser.add_argument(
+            '--database', default='default',
+            help='Database alias to benchmark'
+        )
+
+    def handle(self, *args, **options):
+        conn = connections[options['database']]
+        saved = {
+            key: conn.settings_dict.get(key)
+            for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')
+        }
+        user = get_user_model().objects.create_user(
+            f'benchmark-{uuid.uuid4().hex}@example.com'
+        )
+        key = AuthToken.objects.create_token(user)[1]
+        recipe = Recipe.objects.create(
+            user=user, title='Benchmark', time_minutes=5, price=1
+        )
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': reverse('recipe:recipe-detail', args=[recipe.id]),
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_ACCEPT': 'application/json',
+            'HTTP_AUTHORIZATION': f'Token {key}',
+            'wsgi.url_scheme': 'http',
+            'wsgi.errors': sys.stderr,
+        }
+        handler = WSGIHandler()
+        connects = []
+
+        def count_connect(sender, connection, **kwargs):
+            if connection.alias == conn.alias:
+                connects.append(connection)
+
+        connection_created.connect(count_connect)
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                baseline = None
+                for label, max_age, health_checks in MODES:
+                    conn.close()
+                    conn.settings_dict['CONN_MAX_AGE'] = max_age
+                    conn.settings_dict['CONN_HEALTH_CHECKS'] = health_checks
+                    self._request(handler, environ)
+                    connects.clear()
+                    timings = [
+                        self._request(handler, environ)
+                        for i in range(options['requests'])
+                    ]
+                    median = statistics.median(timings) * 1000
+                    if baseline is None:
+                        baseline = median
+                    self._report(
+                        label, timings, median - baseline, len(connects)
+                    )
+        finally:
+            connection_created.disconnect(count_connect)
+            conn.close()
+            conn.settings_dict.update(saved)
+            user.delete()
+
+    def _request(self, handler, environ):
+        '''Run one request through the handler, returning its duration'''
+        statuses = []
+        start = time.perf_counter()
+        response = handler(
+            dict(environ, **{'wsgi.input': io.BytesIO()}),
+            lambda status, headers: statuses.append(status)
+        )
+        b''.join(response)
+        # Closing the response sends request_finished
+        response.close()
+        elapsed = time.perf_counter() - start
+        if not statuses[0].startswith('200'):
+            raise CommandError(f'Benchmark request failed: {statuses[0]}')
+
+        return elapsed
+
+    def _report(self, label, timings, delta, connects):
+        '''Print the latency summary of one mode'''
+        ordered = sorted(timings)
+        p95 = ordered[int(len(ordered) * 0.95) - 1] * 1000
+        self.stdout.write(
+            f'{label}: median {statistics.median(timings) * 1000:.2f} ms, '
+            f'p95 {p95:.2f} ms, delta {delta:+.2f} ms, '
+            f'{connects} connects'
+        )
@@ -0,0 +1,161 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.models import Ingredient, Recipe, Tag
+from core.search import search_recipes
+from recipe.factories import create_ingredients, create_recipes, \
+                             create_tags, create_users
+
+
+# Indexes added for the list and filter query shapes; they are dropped
+# inside a savepoint to show the plans the database would fall back to
+INDEXES = (
+    'tag_user_name_id_idx',
+    'ingredient_user_name_id_idx',
+    'recipe_user_id_idx',
+    'recipe_tags_tag_recipe_idx',
+    'recipe_ingredients_ingredient_recipe_idx',
+)
+
+# Only created on PostgreSQL, see core migration 0009
+SEARCH_INDEX = 'recipe_search_vector_idx'
+
+
+class Command(BaseCommand):
+    '''Django command to EXPLAIN the recipe query shapes on seeded data
+
+    Everything runs in one transaction that is rolled back at the end
+    (unless --keep), so it is safe to point at a development database.
+    Dropping the indexes takes table locks until the rollback, so do not
+    run it against a database serving traffic.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, default=1000000,
+            help='Number of recipes to seed'
+        )
+        parser.add_argument(
+            '--users', type=int, default=1000,
+            help='Number of users the recipes are spread over'
+        )
+        parser.add_argument(
+            '--attrs', type=int, default=50,
+            help='Tags and ingredients to seed per user'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Timed runs per query'
+        )
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='Commit the seeded rows instead of rolling back'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user_id, tag_id = self._seed(
+                options['users'], options['rows'], options['attrs']
+            )
+            self._analyze()
+            queries = self._queries(user_id, tag_id)
+
+            self.stdout.write(self.style.MIGRATE_HEADING('With indexes'))
+            self._report(queries, options['repeat'])
+
+            savepoint = transaction.savepoint()
+            indexes = INDEXES
+            if connection.vendor == 'postgresql':
+                indexes += (SEARCH_INDEX,)
+            with connection.cursor() as cursor:
+                for name in indexes:
+                    cursor.execute(f'DROP INDEX {name}')
+            self._analyze()
+            self.stdout.write(self.style.MIGRATE_HEADING('Without indexes'))
+            self._report(queries, options['repeat'])
+            transaction.savepoint_rollback(savepoint)
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+    def _seed(self, n_users, n_recipes, n_attrs):
+        '''Seed users, tags, ingredients and recipes with relations'''
+        self.stdout.write(
+            f'Seeding {n_recipes} recipes for {n_users} users...'
+        )
+        rng = random.Random(0)
+        users = create_users(n_users)
+        first_tags = []
+        for index, user in enumerate(users):
+            tags = create_tags(
+                user, [f'Tag {j:05d}' for j in range(n_attrs)]
+            )
+            ingredients = create_ingredients(
+                user, [f'Ingredient {j:05d}' for j in range(n_attrs)]
+            )
+            first_tags = first_tags or tags
+            # Recipe i belongs to user i % n_users
+            create_recipes(
+                user,
+                len(range(index, n_recipes, n_users)),
+                title=lambda i: f'Recipe {index + i * n_users}',
+                time_minutes=lambda i: rng.randint(5, 120),
+                price=lambda i: Decimal(rng.randint(100, 9999)) / 100,
+                tags=lambda i: rng.sample(tags, min(2, len(tags))),
+                ingredients=lambda i: rng.sample(
+                    ingredients, min(2, len(ingredients))
+                )
+            )
+
+        tag_id = first_tags[0].id if first_tags else 0
+
+        return users[0].id, tag_id
+
+    def _analyze(self):
+        '''Refresh planner statistics for the seeded tables'''
+        with connection.cursor() as cursor:
+            for model in (Tag, Ingredient, Recipe, Recipe.tags.through,
+                          Recipe.ingredients.through):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+    def _queries(self, user_id, tag_id):
+        '''Return the query shapes the API issues, by label'''
+        search = search_recipes(
+            Recipe.objects.filter(user_id=user_id), 'tag 00001'
+        )
+        ranked = 'rank' in search.query.annotations
+
+        return {
+            'tag list page': Tag.objects.filter(
+                user_id=user_id
+            ).order_by('-name', 'id')[:51],
+            'ingredient list page': Ingredient.objects.filter(
+                user_id=user_id
+            ).order_by('-name', 'id')[:51],
+            'recipe list page': Recipe.objects.filter(
+                user_id=user_id
+            ).order_by('-id')[:51],
+            'recipes with tag': Recipe.tags.through.objects.filter(
+                tag_id=tag_id
+            ).values_list('recipe_id', flat=True),
+            'recipe search page': search.order_by(
+                *(('-rank', '-id') if ranked else ('-id',))
+            )[:51],
+        }
+
+    def _report(self, queries, repeat):
+        '''Print the plan and median run time of every query'''
+        for label, queryset in queries.items():
+            timings = []
+            for i in range(repeat):
+                start = time.perf_counter()
+                list(queryset.all())
+                timings.append(time.perf_counter() - start)
+            median = statistics.median(timings) * 1000
+            self.stdout.write(f'-- {label} ({median:.2f} ms median)')
+            self.stdout.write(queryset.explain())
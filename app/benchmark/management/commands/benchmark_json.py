@@ -0,0 +1,82 @@
+import io
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from benchmark.utils import median_ms, seed_recipes
+from core.models import Recipe
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer, orjson
+from recipe.serializers import RecipeDetailSerializer
+
+
+class Command(BaseCommand):
+    '''Django command to compare the JSON renderers and parsers
+
+    Seeds recipes with tags and ingredients in a transaction that is
+    rolled back, renders them with RecipeDetailSerializer and times the
+    stdlib and fast JSON paths on the same data.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, default=10000,
+            help='Number of recipes in the payload'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Timed runs per renderer and parser'
+        )
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING(
+                'orjson is not installed, the fast path falls back to json'
+            ))
+
+        with transaction.atomic():
+            data = self._payload(options['recipes'])
+            transaction.set_rollback(True)
+
+        repeat = options['repeat']
+        body = JSONRenderer().render(data)
+        if FastJSONRenderer().render(data) != body:
+            raise CommandError('Fast renderer output differs from DRF')
+        if FastJSONParser().parse(io.BytesIO(body)) != \
+                JSONParser().parse(io.BytesIO(body)):
+            raise CommandError('Fast parser result differs from DRF')
+
+        self.stdout.write(
+            f'{options["recipes"]} recipes, {len(body)} bytes'
+        )
+        self._compare(
+            'render',
+            lambda: JSONRenderer().render(data),
+            lambda: FastJSONRenderer().render(data),
+            repeat
+        )
+        self._compare(
+            'parse',
+            lambda: JSONParser().parse(io.BytesIO(body)),
+            lambda: FastJSONParser().parse(io.BytesIO(body)),
+            repeat
+        )
+
+    def _payload(self, n_recipes):
+        '''Seed recipes and return them as the detail serializer renders'''
+        user = seed_recipes(n_recipes, 'benchmark-json@example.com')
+        recipes = Recipe.objects.filter(user=user).order_by('id') \
+            .prefetch_related('tags', 'ingredients')
+
+        return RecipeDetailSerializer(recipes, many=True).data
+
+    def _compare(self, label, baseline, fast, repeat):
+        '''Print the median time of both callables and the speedup'''
+        medians = [median_ms(func, repeat) for func in (baseline, fast)]
+        self.stdout.write(
+            f'{label}: json {medians[0]:.1f} ms, '
+            f'fast {medians[1]:.1f} ms, '
+            f'{medians[0] / medians[1]:.1f}x'
+        )
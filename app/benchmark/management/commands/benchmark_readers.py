@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from benchmark.utils import median_ms, seed_recipes
+from core.models import Ingredient, Recipe, Tag
+from recipe.readers import RecipeReader
+from recipe.serializers import RecipeDetailSerializer, RecipeSerializer
+
+
+class Command(BaseCommand):
+    '''Django command to compare the recipe serializers with RecipeReader
+
+    Seeds recipes in a transaction that is rolled back, checks that both
+    paths render identical JSON and times them, queries included.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, default=10000,
+            help='Number of recipes to represent'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Timed runs per path'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = seed_recipes(
+                options['recipes'], 'benchmark-readers@example.com'
+            )
+            queryset = Recipe.objects.filter(user=user).order_by('-id')
+            self.stdout.write(f'{options["recipes"]} recipes')
+            for label, serializer_class, detail in (
+                ('list', RecipeSerializer, False),
+                ('detail', RecipeDetailSerializer, True),
+            ):
+                self._compare(
+                    label, queryset, serializer_class, detail,
+                    options['repeat']
+                )
+            transaction.set_rollback(True)
+
+    def _compare(self, label, queryset, serializer_class, detail, repeat):
+        '''Check both paths agree, then print their median times'''
+        related = Ingredient.objects.order_by('id')
+        tags = Tag.objects.order_by('id')
+        if not detail:
+            related, tags = related.only('id'), tags.only('id')
+        prefetched = queryset.prefetch_related(
+            Prefetch('ingredients', related), Prefetch('tags', tags)
+        )
+        reader = RecipeReader({}, detail=detail)
+
+        def serialize():
+            return serializer_class(prefetched.all(), many=True).data
+
+        def read():
+            return reader.represent(reader.values(queryset))
+
+        renderer = JSONRenderer()
+        if renderer.render(serialize()) != renderer.render(read()):
+            raise CommandError(f'{label} output differs from serializer')
+
+        medians = [median_ms(func, repeat) for func in (serialize, read)]
+        self.stdout.write(
+            f'{label}: serializer {medians[0]:.1f} ms, '
+            f'reader {medians[1]:.1f} ms, '
+            f'{medians[0] / medians[1]:.1f}x'
+        )
@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import Recipe
+
+
+class BenchmarkCommandTests(TestCase):
+
+    def test_benchmark_indexes(self):
+        '''Test: index benchmark explains each query and rolls back'''
+        out = StringIO()
+        call_command(
+            'benchmark_indexes', '--rows', '40', '--users', '2',
+            '--attrs', '3', '--repeat', '1', stdout=out
+        )
+
+        output = out.getvalue()
+        self.assertIn('With indexes', output)
+        self.assertIn('Without indexes', output)
+        self.assertIn('recipe_user_id_idx', output)
+        self.assertEqual(output.count('-- recipe list page'), 2)
+        self.assertEqual(output.count('-- recipe search page'), 2)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_connections(self):
+        '''Test: connection benchmark times every mode and cleans up'''
+        out = StringIO()
+        call_command(
+            'benchmark_connections', '--requests', '3', stdout=out
+        )
+
+        output = out.getvalue()
+        self.assertIn('connection per request: median', output)
+        self.assertIn('persistent + health checks: median', output)
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_benchmark_json(self):
+        '''Test: JSON benchmark compares both paths and rolls back'''
+        out = StringIO()
+        call_command(
+            'benchmark_json', '--recipes', '20', '--repeat', '1', stdout=out
+        )
+
+        output = out.getvalue()
+        self.assertIn('render: json', output)
+        self.assertIn('parse: json', output)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_readers(self):
+        '''Test: reader benchmark checks parity and rolls back'''
+        out = StringIO()
+        call_command(
+            'benchmark_readers', '--recipes', '20', '--repeat', '1',
+            stdout=out
+        )
+
+        output = out.getvalue()
+        self.assertIn('list: serializer', output)
+        self.assertIn('detail: serializer', output)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_api(self):
+        '''Test: API benchmark reports every scenario and cleans up'''
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as media, \
+                self.settings(MEDIA_ROOT=media):
+            call_command(
+                'benchmark_api', '--users', '2', '--recipes', '5',
+                '--requests', '4', '--warmup', '1', '--concurrency', '1',
+                stdout=out, stderr=StringIO()
+            )
+            leftovers = [files for root, dirs, files in os.walk(media)]
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['target'], 'in-process')
+        self.assertEqual(
+            sorted(report['scenarios']),
+            ['create', 'detail', 'filter', 'list', 'upload-image']
+        )
+        for scenario in report['scenarios'].values():
+            self.assertEqual(scenario['requests'], 4)
+            self.assertEqual(scenario['errors'], 0)
+            self.assertEqual(
+                sorted(scenario['latency_ms']),
+                ['max', 'mean', 'p50', 'p95', 'p99']
+            )
+        self.assertGreater(report['scenarios']['detail']['queries']['p50'], 0)
+        self.assertFalse(any(leftovers))
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(get_user_model().objects.exists())
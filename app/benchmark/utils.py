@@ -0,0 +1,61 @@
+import math
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+
+from recipe.factories import create_ingredients, create_recipes, \
+                             create_tags
+
+
+def seed_recipes(n_recipes, email='benchmark@example.com', n_tags=20,
+                 n_ingredients=50, per_recipe=3, seed=0):
+    '''Create a user owning n_recipes recipes with tags and ingredients
+
+    Every recipe gets per_recipe of the user's n_tags tags and of the
+    n_ingredients ingredients, picked by a generator seeded with seed.
+    Returns the user. Meant to run inside a transaction that is rolled
+    back afterwards, or to be deleted with the user.
+    '''
+    rng = random.Random(seed)
+    user = get_user_model().objects.create_user(email)
+    tags = create_tags(user, n_tags)
+    ingredients = create_ingredients(
+        user, [f'Ingrédient {i}' for i in range(n_ingredients)]
+    )
+    create_recipes(
+        user,
+        n_recipes,
+        title=lambda i: f'Recipe {i} – “quoted”',
+        time_minutes=lambda i: rng.randint(5, 120),
+        price=lambda i: Decimal(rng.randint(100, 9999)) / 100,
+        link=lambda i: f'https://example.com/recipes/{i}',
+        tags=lambda i: rng.sample(tags, min(per_recipe, len(tags))),
+        ingredients=lambda i: rng.sample(
+            ingredients, min(per_recipe, len(ingredients))
+        )
+    )
+
+    return user
+
+
+def median_ms(func, repeat):
+    '''Call func repeat times and return the median run time in ms'''
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return statistics.median(timings) * 1000
+
+
+def percentile(ordered, q):
+    '''Return the nearest-rank q-th percentile of a sorted list'''
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+
+    return ordered[rank - 1]
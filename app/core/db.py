@@ -0,0 +1,93 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import close_old_connections, connections
+from django.dispatch import receiver
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _install_health_check(conn):
+    '''Make conn check itself on its first use after request_started
+
+    Django 3.1 has no hook before a connection is used, so ensure_connection,
+    which every cursor and transaction goes through, is wrapped on the
+    instance. The class method is looked up on each call.
+    '''
+    def ensure_healthy_connection():
+        if conn.health_check_pending:
+            conn.health_check_pending = False
+            if (conn.connection is not None and
+                    not conn.in_atomic_block and
+                    not conn.is_usable()):
+                conn.close()
+        type(conn).ensure_connection(conn)
+
+    conn.ensure_connection = ensure_healthy_connection
+    conn.health_check_installed = True
+
+
+@receiver(request_started)
+def check_connection_health(**kwargs):
+    '''Check persistent connections before a request first uses them
+
+    Runs after Django's own close_old_connections for every database with
+    CONN_HEALTH_CHECKS set, so a connection dropped by the server, a
+    pooler or a failover is replaced before the request uses it instead
+    of failing the request. As in Django 4.1 the check waits for the
+    first query, so requests answered from caches pay nothing.
+    '''
+    for conn in connections.all():
+        if not conn.settings_dict.get('CONN_HEALTH_CHECKS'):
+            continue
+        if not getattr(conn, 'health_check_installed', False):
+            _install_health_check(conn)
+        conn.health_check_pending = True
+
+
+def db_executor():
+    '''Return the process wide pool that runs blocking database work
+
+    Created on first use so forked workers start their own threads. Each
+    thread keeps its own persistent connection, so ASYNC_DB_THREADS also
+    bounds the connections one process opens.
+    '''
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_DB_THREADS,
+                thread_name_prefix='db'
+            )
+
+    return _executor
+
+
+def _run_with_connections(func, args, kwargs):
+    '''Run func with the request lifecycle connection handling'''
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_db_thread(func, *args, **kwargs):
+    '''Await func(*args, **kwargs) run on the database thread pool
+
+    func runs in a copy of the caller's context, so context variables
+    such as the request metrics in core.metrics carry over.
+    '''
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+
+    return await loop.run_in_executor(db_executor(), functools.partial(
+        context.run, _run_with_connections, func, args, kwargs
+    ))
@@ -0,0 +1,62 @@
+import tempfile
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.utils import Error
+
+
+_migrated = set()
+
+
+class NotReady(Exception):
+    '''A readiness check failed'''
+
+
+def check_database(alias=DEFAULT_DB_ALIAS):
+    '''Run a trivial query, opening a connection if there is none'''
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except Error as exc:
+        raise NotReady(f'database unavailable: {exc}') from exc
+
+
+def check_migrations(alias=DEFAULT_DB_ALIAS):
+    '''Check every migration on disk has been applied
+
+    Loading the migration graph is not free, so a database found fully
+    migrated is not checked again by this process.
+    '''
+    if alias in _migrated:
+        return
+    try:
+        executor = MigrationExecutor(connections[alias])
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    except Error as exc:
+        raise NotReady(f'database unavailable: {exc}') from exc
+    if plan:
+        names = ', '.join(
+            f'{migration.app_label}.{migration.name}'
+            for migration, backwards in plan
+        )
+        raise NotReady(f'unapplied migrations: {names}')
+
+    _migrated.add(alias)
+
+
+def check_media(root=None):
+    '''Check a file can be created in MEDIA_ROOT'''
+    try:
+        with tempfile.TemporaryFile(dir=root or settings.MEDIA_ROOT):
+            pass
+    except OSError as exc:
+        raise NotReady(f'media not writable: {exc}') from exc
+
+
+READINESS_CHECKS = (
+    ('database', check_database),
+    ('migrations', check_migrations),
+    ('media', check_media),
+)
@@ -0,0 +1,146 @@
+import io
+import os
+from datetime import timedelta
+
+from PIL import Image, ImageOps, features
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.journal import record_changes
+from core.models import ChangeLog, ImageJob, Recipe
+from recipe.cache import bump_user_version
+
+
+FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpeg', 'JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+)
+
+
+def rendition_path(source, width, extension):
+    '''Return the deterministic storage path of a rendition'''
+    stem = os.path.splitext(os.path.basename(source))[0]
+
+    return os.path.join(
+        'uploads/recipe/renditions/', stem, f'{width}w.{extension}'
+    )
+
+
+def enqueue_image_job(recipe):
+    '''Queue rendition generation for the recipe's current image'''
+    return ImageJob.objects.create(recipe=recipe, source=recipe.image.name)
+
+
+def _formats():
+    '''Return the output formats this Pillow build can encode'''
+    return [
+        fmt for fmt in FORMATS
+        if fmt[0] != 'webp' or features.check('webp')
+    ]
+
+
+def build_renditions(source):
+    '''Write resized renditions of source and return their storage map'''
+    with default_storage.open(source) as fh:
+        image = Image.open(fh)
+        image.load()
+    # Renditions carry no EXIF, so camera rotation is applied to the pixels
+    image = ImageOps.exif_transpose(image)
+
+    renditions = {}
+    for extension, pil_format, options in _formats():
+        renditions[extension] = {}
+        for width in settings.IMAGE_RENDITION_WIDTHS:
+            if width > image.width and renditions[extension]:
+                break
+            resized = image.copy()
+            resized.thumbnail((width, image.height), Image.LANCZOS)
+            if pil_format == 'JPEG' and resized.mode != 'RGB':
+                resized = resized.convert('RGB')
+            buffer = io.BytesIO()
+            resized.save(buffer, pil_format, **options)
+
+            path = rendition_path(source, width, extension)
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            renditions[extension][str(width)] = default_storage.save(
+                path, ContentFile(buffer.getvalue())
+            )
+
+    return renditions
+
+
+def claim_jobs(limit):
+    '''Mark up to limit runnable jobs as running and return them
+
+    Jobs left running past IMAGE_JOB_TIMEOUT (a crashed worker) are
+    claimed again. Row locks are skipped where the database supports it
+    so several workers can poll the same table.
+    '''
+    stale = timezone.now() - timedelta(seconds=settings.IMAGE_JOB_TIMEOUT)
+    with transaction.atomic():
+        queryset = ImageJob.objects.filter(
+            Q(status=ImageJob.PENDING) |
+            Q(status=ImageJob.RUNNING, updated_at__lt=stale)
+        ).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        ids = list(queryset.values_list('id', flat=True)[:limit])
+        ImageJob.objects.filter(id__in=ids).update(
+            status=ImageJob.RUNNING,
+            attempts=F('attempts') + 1,
+            updated_at=timezone.now()
+        )
+
+    return list(
+        ImageJob.objects.filter(id__in=ids)
+        .select_related('recipe').order_by('id')
+    )
+
+
+def process_job(job):
+    '''Generate renditions for a claimed job and record the outcome'''
+    recipe = job.recipe
+    if recipe.image.name != job.source:
+        # A newer upload replaced this image and queued its own job
+        job.status = ImageJob.DONE
+        job.save(update_fields=['status', 'updated_at'])
+        return job
+
+    try:
+        renditions = build_renditions(job.source)
+    except Exception as exc:
+        job.last_error = f'{type(exc).__name__}: {exc}'
+        job.status = (
+            ImageJob.FAILED
+            if job.attempts >= settings.IMAGE_JOB_MAX_ATTEMPTS
+            else ImageJob.PENDING
+        )
+        job.save(update_fields=['status', 'last_error', 'updated_at'])
+        return job
+
+    # Only while the image is still this job's: a newer upload saved
+    # during the resize gets the renditions of its own job
+    if Recipe.objects.filter(pk=recipe.pk, image=job.source).update(
+            renditions=renditions, updated_at=timezone.now()):
+        record_changes(recipe.user_id, ChangeLog.RECIPE, [recipe.pk])
+        bump_user_version(recipe.user_id)
+    job.status = ImageJob.DONE
+    job.last_error = ''
+    job.save(update_fields=['status', 'last_error', 'updated_at'])
+
+    return job
+
+
+def process_pending_jobs(limit=10):
+    '''Claim and process one batch of jobs, returning how many ran'''
+    jobs = claim_jobs(limit)
+    for job in jobs:
+        process_job(job)
+
+    return len(jobs)
@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from core.models import ChangeLog
+
+
+def record_changes(user_id, kind, object_ids, deleted=False):
+    '''Append one journal entry per object to the user's change log'''
+    ChangeLog.objects.bulk_create([
+        ChangeLog(
+            user_id=user_id, kind=kind, object_id=pk, deleted=deleted
+        )
+        for pk in dict.fromkeys(object_ids)
+    ])
+
+
+def retention_cutoff():
+    '''Return the time before which journal entries may be dropped'''
+    return timezone.now() - timedelta(days=settings.SYNC_RETENTION_DAYS)
+
+
+def compact_changes():
+    '''Drop journal entries no sync token can still need
+
+    An entry is superseded once a later entry exists for the same
+    object, since sync only reports the latest state. Anything older
+    than the retention window goes too: tokens that old are answered
+    with a full snapshot. Returns the number of entries deleted.
+    '''
+    superseded = ChangeLog.objects.filter(Exists(
+        ChangeLog.objects.filter(
+            kind=OuterRef('kind'),
+            object_id=OuterRef('object_id'),
+            id__gt=OuterRef('id'),
+        )
+    ))
+    orphaned = ChangeLog.objects.exclude(Exists(
+        get_user_model().objects.filter(id=OuterRef('user_id'))
+    ))
+    expired = ChangeLog.objects.filter(created_at__lt=retention_cutoff())
+
+    return sum(
+        queryset.delete()[0] for queryset in (expired, orphaned, superseded)
+    )
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.journal import compact_changes
+
+
+class Command(BaseCommand):
+    '''Django command to compact the sync change journal'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Seconds between compactions; run once when 0'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = compact_changes()
+            self.stdout.write(f'Removed {deleted} change journal entries')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
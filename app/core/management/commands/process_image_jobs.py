@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.images import process_pending_jobs
+
+
+class Command(BaseCommand):
+    '''Django command to run the recipe image rendition worker'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Process the jobs currently queued, then exit'
+        )
+        parser.add_argument(
+            '--batch', type=int, default=10,
+            help='Number of jobs to claim at a time'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Seconds to wait when the queue is empty'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Processing image jobs...')
+        while True:
+            processed = process_pending_jobs(options['batch'])
+            if processed:
+                self.stdout.write(f'Processed {processed} image job(s)')
+            elif options['once']:
+                break
+            else:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS('Image job queue empty'))
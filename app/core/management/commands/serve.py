@@ -0,0 +1,108 @@
+import os
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+def cpu_count():
+    '''Return the CPUs this process may run on'''
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+
+    return os.cpu_count() or 1
+
+
+class Command(BaseCommand):
+    '''Django command to run the API under a multi-worker gunicorn server
+
+    WSGI runs threaded workers, which honour --keep-alive and still hand
+    FileResponse bodies to sendfile(); gunicorn's synchronous workers
+    would close every connection after one response. ASGI runs uvicorn
+    workers. The process is replaced by gunicorn, so it receives the
+    container's signals directly.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bind', default=os.environ.get('SERVER_BIND', '0.0.0.0:8000'),
+            help='Address to listen on'
+        )
+        parser.add_argument(
+            '--interface', choices=('wsgi', 'asgi'),
+            default=os.environ.get('SERVER_INTERFACE', 'wsgi'),
+            help='Serve app/wsgi.py or app/asgi.py'
+        )
+        parser.add_argument(
+            '--workers', type=int,
+            default=int(os.environ.get('SERVER_WORKERS', 0)),
+            help='Worker processes, derived from the CPU count by default'
+        )
+        parser.add_argument(
+            '--threads', type=int,
+            default=int(os.environ.get('SERVER_THREADS', 4)),
+            help='Request threads per WSGI worker'
+        )
+        parser.add_argument(
+            '--keep-alive', type=int,
+            default=int(os.environ.get('SERVER_KEEP_ALIVE', 5)),
+            help='Seconds to hold idle keep-alive connections open'
+        )
+        parser.add_argument(
+            '--timeout', type=int,
+            default=int(os.environ.get('SERVER_TIMEOUT', 30)),
+            help='Seconds before a silent worker is restarted'
+        )
+        parser.add_argument(
+            '--max-requests', type=int,
+            default=int(os.environ.get('SERVER_MAX_REQUESTS', 10000)),
+            help='Requests after which a worker is recycled, 0 never'
+        )
+
+    def handle(self, *args, **options):
+        argv = self.gunicorn_argv(options)
+        self.stdout.write(' '.join(argv[1:]))
+        self.stdout.flush()
+        os.execv(sys.executable, argv)
+
+    def gunicorn_argv(self, options):
+        '''Return the command line that starts gunicorn'''
+        workers = options['workers']
+        if not workers:
+            # Threads share one interpreter lock, so oversubscribe the
+            # CPUs; an event loop per CPU is enough for uvicorn workers
+            cpus = cpu_count()
+            workers = 2 * cpus + 1 if options['interface'] == 'wsgi' else cpus
+
+        argv = [
+            sys.executable, '-m', 'gunicorn',
+            f'app.{options["interface"]}:application',
+            '--bind', options['bind'],
+            '--workers', str(workers),
+            '--keep-alive', str(options['keep_alive']),
+            '--timeout', str(options['timeout']),
+            '--max-requests', str(options['max_requests']),
+            '--max-requests-jitter', str(options['max_requests'] // 10),
+            '--access-logfile', '-',
+        ]
+        if workers > 1 and settings.CACHES['api']['BACKEND'].endswith(
+                'LocMemCache'):
+            # Each worker would invalidate only its own copy of the
+            # response cache and serve stale lists from the others
+            self.stderr.write(
+                'The api cache is per process; response caching is off. '
+                'Set API_CACHE_BACKEND to a shared cache to enable it.'
+            )
+            argv += ['--env', 'API_CACHE_TIMEOUT=0']
+        if os.path.isdir('/dev/shm'):
+            # Worker heartbeats on a disk backed /tmp can stall workers
+            argv += ['--worker-tmp-dir', '/dev/shm']
+        if options['interface'] == 'asgi':
+            argv += ['--worker-class', 'uvicorn.workers.UvicornWorker']
+        else:
+            argv += [
+                '--worker-class', 'gthread',
+                '--threads', str(options['threads']),
+            ]
+
+        return argv
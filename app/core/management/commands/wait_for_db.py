@@ -1,21 +1,60 @@
+import random
 import time
 
-from django.core.management.base import BaseCommand
-from django.db import connections
-from django.db.utils import OperationalError
+from django.core.management.base import BaseCommand, CommandError
+
+from core.health import NotReady, check_database, check_media, \
+                        check_migrations
 
 
 class Command(BaseCommand):
-    '''Django command to pause execution until DB is available'''
+    '''Django command to pause execution until the app can start
+
+    Connects to the database for real, retrying with exponential backoff
+    and full jitter until it succeeds or the timeout runs out.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='Seconds to wait before failing'
+        )
+        parser.add_argument(
+            '--max-delay', type=float, default=2,
+            help='Longest wait between attempts, in seconds'
+        )
+        parser.add_argument(
+            '--migrations', action='store_true',
+            help='Also wait until every migration is applied'
+        )
+        parser.add_argument(
+            '--media', action='store_true',
+            help='Also check MEDIA_ROOT is writable'
+        )
 
     def handle(self, *args, **options):
+        checks = [check_database]
+        if options['migrations']:
+            checks.append(check_migrations)
+        if options['media']:
+            checks.append(check_media)
+
         self.stdout.write('Waiting for DB...')
-        db_conn = None
-        while not db_conn:
+        deadline = time.monotonic() + options['timeout']
+        attempt = 0
+        while True:
             try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write('DB not available, waiting 1 second...')
-                time.sleep(1)
+                for check in checks:
+                    check()
+                break
+            except NotReady as exc:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(f'Not ready: {exc}')
+                backoff = min(options['max_delay'], 0.05 * 2 ** attempt)
+                delay = min(random.uniform(0, backoff), remaining)
+                self.stdout.write(f'{exc}, retrying in {delay:.2f}s...')
+                time.sleep(delay)
+                attempt += 1
 
         self.stdout.write(self.style.SUCCESS('DB available!'))
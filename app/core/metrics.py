@@ -0,0 +1,219 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils.decorators import sync_and_async_middleware
+
+
+# Log spaced bucket bounds, two per power of two, so every bucket has
+# the same relative width like an HDR histogram
+SECONDS_BOUNDS = tuple(
+    round(0.0001 * 2 ** (i / 2), 6) for i in range(40)
+)
+QUERY_BOUNDS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 24, 32, 48, 64, 96, 128,
+                192, 256, 384, 512, 1024)
+
+METRICS = (
+    ('request_duration_seconds', 'Time to answer the request',
+     SECONDS_BOUNDS),
+    ('db_queries', 'SQL queries run for the request', QUERY_BOUNDS),
+    ('db_duration_seconds', 'Time spent in SQL queries', SECONDS_BOUNDS),
+    ('serialize_duration_seconds',
+     'Time spent building and rendering response bodies, SQL excluded',
+     SECONDS_BOUNDS),
+)
+
+# Methods recorded under their own name; clients choose the method, so
+# anything else shares one OTHER series instead of adding new ones
+METHODS = frozenset(
+    ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+)
+
+_stats = contextvars.ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    '''Counters for the request being served'''
+    __slots__ = ('queries', 'db_time', 'serialize_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+
+
+class Histogram:
+    '''Fixed bucket histogram of observed values'''
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    '''Histograms of every metric, per view and method'''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, view, method, values):
+        '''Record one request's values, in METRICS order'''
+        with self._lock:
+            histograms = self._series.get((view, method))
+            if histograms is None:
+                histograms = self._series[view, method] = [
+                    Histogram(bounds) for name, text, bounds in METRICS
+                ]
+            for histogram, value in zip(histograms, values):
+                histogram.observe(value)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        '''Return every histogram in the Prometheus text format'''
+        with self._lock:
+            series = sorted(
+                (key, [
+                    (list(h.counts), h.sum, h.count) for h in histograms
+                ])
+                for key, histograms in self._series.items()
+            )
+
+        lines = []
+        for index, (name, text, bounds) in enumerate(METRICS):
+            name = f'api_{name}'
+            lines.append(f'# HELP {name} {text}.')
+            lines.append(f'# TYPE {name} histogram')
+            les = [f'{bound:g}' for bound in bounds] + ['+Inf']
+            for (view, method), histograms in series:
+                counts, total, count = histograms[index]
+                labels = f'view="{_escape(view)}",method="{_escape(method)}"'
+                cumulative = 0
+                for le, bucket in zip(les, counts):
+                    cumulative += bucket
+                    lines.append(
+                        f'{name}_bucket{{{labels},le="{le}"}} {cumulative}'
+                    )
+                lines.append(f'{name}_sum{{{labels}}} {total:.6g}')
+                lines.append(f'{name}_count{{{labels}}} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def _escape(value):
+    '''Escape a label value for the Prometheus text format'''
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n'
+    )
+
+
+def record_query(execute, sql, params, many, context):
+    '''Execute wrapper counting and timing queries of measured requests'''
+    stats = _stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_time += perf_counter() - start
+        stats.queries += 1
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    '''Add record_query to every connection once'''
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def timed_serialization(func):
+    '''Count the time func takes, less its SQL, as serialization time'''
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        stats = _stats.get()
+        if stats is None:
+            return func(*args, **kwargs)
+
+        start, db_time = perf_counter(), stats.db_time
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats.serialize_time += (
+                perf_counter() - start - (stats.db_time - db_time)
+            )
+
+    return wrapper
+
+
+def _finish(request, response, stats, start):
+    '''Record the request and add the Server-Timing header'''
+    duration = perf_counter() - start
+    match = request.resolver_match
+    registry.observe(
+        match.view_name if match else '<unresolved>',
+        request.method if request.method in METHODS else 'OTHER',
+        (duration, stats.queries, stats.db_time, stats.serialize_time)
+    )
+    if settings.METRICS_SERVER_TIMING:
+        response['Server-Timing'] = (
+            f'db;dur={stats.db_time * 1000:.1f};'
+            f'desc="{stats.queries} queries", '
+            f'serialize;dur={stats.serialize_time * 1000:.1f}, '
+            f'total;dur={duration * 1000:.1f}'
+        )
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    '''Measure each request's latency, queries and serialization time
+
+    Queries are attributed through a context variable, so work the
+    request hands to the database thread pool is counted too.
+    '''
+    if not settings.METRICS_ENABLED:
+        raise MiddlewareNotUsed
+
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            start, stats = perf_counter(), RequestStats()
+            token = _stats.set(stats)
+            try:
+                response = await get_response(request)
+            finally:
+                _stats.reset(token)
+            _finish(request, response, stats, start)
+            return response
+    else:
+        def middleware(request):
+            start, stats = perf_counter(), RequestStats()
+            token = _stats.set(stats)
+            try:
+                response = get_response(request)
+            finally:
+                _stats.reset(token)
+            _finish(request, response, stats, start)
+            return response
+
+    return middleware
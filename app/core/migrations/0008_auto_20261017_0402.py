@@ -0,0 +1,38 @@
+# Generated by Django 3.1.14 on 2026-10-17 04:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_auto_20261017_0400'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', '-name', 'id'], name='ingredient_user_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', '-id'], name='recipe_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', '-name', 'id'], name='tag_user_name_id_idx'),
+        ),
+        # The auto-created through tables are keyed (recipe_id, x_id); these
+        # serve the reverse lookups (recipes for a tag/ingredient) from the
+        # index alone.
+        migrations.RunSQL(
+            'CREATE INDEX recipe_tags_tag_recipe_idx '
+            'ON core_recipe_tags (tag_id, recipe_id)',
+            reverse_sql='DROP INDEX recipe_tags_tag_recipe_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX recipe_ingredients_ingredient_recipe_idx '
+            'ON core_recipe_ingredients (ingredient_id, recipe_id)',
+            reverse_sql='DROP INDEX recipe_ingredients_ingredient_recipe_idx',
+        ),
+    ]
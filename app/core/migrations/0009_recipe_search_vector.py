@@ -0,0 +1,43 @@
+# Generated by Django 3.1.14 on 2026-10-17 04:06
+
+import core.models
+from django.db import migrations
+
+from core.search import update_search_vectors
+
+
+def populate_search_vectors(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    update_search_vectors(Recipe.objects.using(schema_editor.connection.alias))
+
+
+def create_search_index(apps, schema_editor):
+    # GIN indexes only exist on PostgreSQL; other databases fall back to
+    # LIKE matching in core.search
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX recipe_search_vector_idx '
+            'ON core_recipe USING gin (search_vector)'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX recipe_search_vector_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_auto_20261017_0402'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=core.models.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(populate_search_vectors, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.1.14 on 2026-10-17 04:42
+
+import hashlib
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def copy_legacy_tokens(apps, schema_editor):
+    # Clients keep their DRF tokens, now stored hashed and not expiring.
+    # authtoken_token is left as it was so the migration can be reversed
+    Token = apps.get_model('authtoken', 'Token')
+    AuthToken = apps.get_model('core', 'AuthToken')
+    alias = schema_editor.connection.alias
+    AuthToken.objects.using(alias).bulk_create([
+        AuthToken(
+            user_id=token.user_id,
+            prefix=token.key[:8],
+            digest=hashlib.sha256(token.key.encode()).hexdigest(),
+            label='Legacy token',
+            created_at=token.created,
+        )
+        for token in Token.objects.using(alias).iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authtoken', '0002_auto_20160226_1747'),
+        ('core', '0010_changelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(db_index=True, max_length=8)),
+                ('digest', models.CharField(max_length=64)),
+                ('label', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auth_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(copy_legacy_tokens, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,14 @@
+import hashlib
+import secrets
 import uuid
 import os
+from datetime import timedelta
 
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
                                         PermissionsMixin
 from django.conf import settings
+from django.utils import timezone
 
 
 def recipe_image_file_path(instance, filename):
@@ -57,6 +61,14 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-name', 'id'],
+                name='tag_user_name_id_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -69,10 +81,44 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-name', 'id'],
+                name='ingredient_user_name_id_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
 
+class SearchVectorField(models.TextField):
+    '''Full-text search document, a tsvector on PostgreSQL
+
+    Other databases store the lower cased document text, which
+    core.search matches with LIKE so the tests run on SQLite.
+    '''
+
+    def db_type(self, connection):
+        if connection.vendor == 'postgresql':
+            return 'tsvector'
+
+        return super().db_type(connection)
+
+
+@SearchVectorField.register_lookup
+class SearchMatch(models.Lookup):
+    '''Match a search vector against a tsquery with the @@ operator'''
+    lookup_name = 'matches'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+
+        return f'{lhs} @@ {rhs}', lhs_params + rhs_params
+
+
 class Recipe(models.Model):
     '''Recipe object'''
     title = models.CharField(max_length=255)
@@ -86,6 +132,170 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    renditions = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-id'], name='recipe_user_id_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class ImageJob(models.Model):
+    '''Queued request to generate resized renditions of a recipe image'''
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    recipe = models.ForeignKey('Recipe', on_delete=models.CASCADE)
+    source = models.CharField(max_length=255)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'id'])]
+
+    def __str__(self):
+        return f'{self.source} ({self.status})'
+
+
+class ChangeLog(models.Model):
+    '''Append-only journal of changes to user owned objects
+
+    Each save or delete of a recipe, tag or ingredient appends a row;
+    deletes leave a tombstone. Offline clients sync from the rows
+    after the last one they have seen.
+    '''
+    RECIPE = 'recipe'
+    TAG = 'tag'
+    INGREDIENT = 'ingredient'
+    KIND_CHOICES = (
+        (RECIPE, 'Recipe'),
+        (TAG, 'Tag'),
+        (INGREDIENT, 'Ingredient'),
+    )
+
+    # No constraint: deleting a user deletes their recipes, and the
+    # tombstones written for those must not block it
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.IntegerField()
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='changelog_user_id_idx'),
+            models.Index(
+                fields=['kind', 'object_id', 'id'],
+                name='changelog_object_idx'
+            ),
+            models.Index(fields=['created_at'], name='changelog_created_idx'),
+        ]
+
+    def __str__(self):
+        action = 'deleted' if self.deleted else 'saved'
+        return f'{self.kind} {self.object_id} {action}'
+
+
+class AuthTokenManager(models.Manager):
+
+    def create_token(self, user, label='', ttl=None):
+        '''Create a token for user and return it with its key
+
+        The key is only available here; the row stores its hash. Tokens
+        expire after ttl seconds, AUTH_TOKEN_TTL by default, and never
+        when that is 0. The user's expired tokens, and their oldest past
+        AUTH_TOKEN_MAX_PER_USER, are deleted.
+        '''
+        ttl = settings.AUTH_TOKEN_TTL if ttl is None else ttl
+        key = secrets.token_hex(AuthToken.PREFIX_LENGTH // 2) + \
+            secrets.token_urlsafe(32)
+        token = self.create(
+            user=user,
+            prefix=key[:AuthToken.PREFIX_LENGTH],
+            digest=AuthToken.hash_key(key),
+            label=label,
+            expires_at=timezone.now() + timedelta(seconds=ttl) if ttl else None
+        )
+        stale = self.filter(user=user).order_by('-created_at', '-id')[
+            settings.AUTH_TOKEN_MAX_PER_USER:
+        ]
+        self.filter(
+            models.Q(pk__in=list(stale.values_list('pk', flat=True))) |
+            models.Q(user=user, expires_at__lte=timezone.now())
+        ).delete()
+
+        return token, key
+
+
+class AuthToken(models.Model):
+    '''API token for one of a user's devices
+
+    Only a SHA-256 digest of the key is stored. Keys are random, so a
+    fast hash is enough; the key's first characters are kept as an
+    indexed prefix to find the row.
+    '''
+    PREFIX_LENGTH = 8
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='auth_tokens',
+    )
+    prefix = models.CharField(max_length=PREFIX_LENGTH, db_index=True)
+    digest = models.CharField(max_length=64)
+    label = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    objects = AuthTokenManager()
+
+    @staticmethod
+    def hash_key(key):
+        '''Return the digest stored for key'''
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def has_expired(self):
+        return (
+            self.expires_at is not None and self.expires_at <= timezone.now()
+        )
+
+    def __str__(self):
+        return f'{self.prefix}... {self.label}'.rstrip()
+
+
+class TokenRevocation(models.Model):
+    '''Digest of a revoked auth token, for every process to evict
+
+    Rows only matter while a revoked token can still sit in a process's
+    token cache, so they are pruned after AUTH_TOKEN_CACHE_TTL.
+    '''
+    digest = models.CharField(max_length=64)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return self.digest
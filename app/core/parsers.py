@@ -0,0 +1,43 @@
+import codecs
+import io
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from core.renderers import FastJSONRenderer, orjson
+
+
+# orjson reads integers outside the 64 bit range as floats, so bodies with
+# a run of 19 digits (rare, and harmless inside strings) go to JSONParser;
+# see EXPONENT_TABLE in core.renderers for the translate trick
+DIGIT_TABLE = bytes(
+    ord('0') if chr(i) in '0123456789' else 32 for i in range(256)
+)
+LONG_NUMBER = b'0' * 19
+
+
+class FastJSONParser(JSONParser):
+    '''JSONParser that decodes UTF-8 bodies with orjson when installed
+
+    Bodies orjson rejects are parsed again by JSONParser, so invalid JSON
+    fails with the same error message, and so are bodies that may hold
+    integers wider than 64 bits, which orjson would turn into floats.
+    '''
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        '''Parse the incoming bytestream as JSON and return the data'''
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if (orjson is None or not self.strict or
+                codecs.lookup(encoding).name != 'utf-8'):
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        if LONG_NUMBER not in body.translate(DIGIT_TABLE):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                pass
+
+        return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, FloatField, OuterRef, Subquery
+from django.db.models.functions import Cast
+
+
+BATCH_SIZE = 500
+
+
+def _relations(model):
+    '''Return the (through model, field) pairs indexed after the title'''
+    return (
+        (model.tags.through, 'tag'),
+        (model.ingredients.through, 'ingredient'),
+    )
+
+
+def _names(through, field):
+    '''Subquery aggregating the related names of the outer recipe'''
+    from django.contrib.postgres.aggregates import StringAgg
+
+    return Subquery(
+        through.objects.filter(recipe_id=OuterRef('pk'))
+        .values('recipe_id')
+        .annotate(names=StringAgg(f'{field}__name', ' '))
+        .values('names')
+    )
+
+
+def update_search_vectors(queryset):
+    '''Rebuild the search vector of every recipe in queryset
+
+    On PostgreSQL this is a single UPDATE weighting the title above tag
+    names above ingredient names; elsewhere the lower cased document text
+    is built in Python. Works with historical models in migrations.
+    '''
+    model = queryset.model
+    if connections[queryset.db].vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchVector
+
+        config = settings.SEARCH_CONFIG
+        vector = SearchVector('title', weight='A', config=config)
+        for (through, field), weight in zip(_relations(model), 'BC'):
+            vector = vector + SearchVector(
+                _names(through, field), weight=weight, config=config
+            )
+
+        return queryset.order_by().update(search_vector=vector)
+
+    names = {}
+    for through, field in _relations(model):
+        rows = through.objects.filter(
+            recipe__in=queryset.order_by().values('pk')
+        ).values_list('recipe_id', f'{field}__name')
+        for recipe_id, name in rows.iterator():
+            names.setdefault(recipe_id, []).append(name)
+
+    recipes = [
+        model(pk=pk, search_vector=' '.join(
+            [title, *names.get(pk, ())]
+        ).lower())
+        for pk, title in queryset.values_list('pk', 'title').iterator()
+    ]
+    model.objects.bulk_update(recipes, ['search_vector'], BATCH_SIZE)
+
+    return len(recipes)
+
+
+def search_recipes(queryset, text):
+    '''Filter recipes matching the search text
+
+    On PostgreSQL the text is parsed as a web search query (quoted
+    phrases, `or`, `-word`) and matches are annotated with their `rank`.
+    Elsewhere every word must occur in the document and nothing is ranked.
+    '''
+    if connections[queryset.db].vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        query = SearchQuery(
+            text, config=settings.SEARCH_CONFIG, search_type='websearch'
+        )
+        # ts_rank returns a real; widen it so the cursor pagination
+        # position round-trips through Python floats exactly
+        rank = Cast(SearchRank(F('search_vector'), query), FloatField())
+
+        return queryset.filter(
+            search_vector__matches=query
+        ).annotate(rank=rank)
+
+    for term in text.lower().split():
+        queryset = queryset.filter(search_vector__contains=term)
+
+    return queryset
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+# MD5 is only acceptable because test passwords protect nothing; the
+# configured hashers stay listed so their hashes still verify
+FAST_PASSWORD_HASHER = 'django.contrib.auth.hashers.MD5PasswordHasher'
+
+
+class FastHashingTestRunner(DiscoverRunner):
+    '''Test runner that hashes passwords with a cheap hasher
+
+    create_user and the token endpoint would otherwise pay the full
+    PBKDF2 cost for every test user.
+    '''
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._hashers = override_settings(
+            PASSWORD_HASHERS=[FAST_PASSWORD_HASHER, *settings.PASSWORD_HASHERS]
+        )
+        self._hashers.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._hashers.disable()
+        super().teardown_test_environment(**kwargs)
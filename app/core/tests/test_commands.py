@@ -1,25 +1,140 @@
+from io import StringIO
 from unittest.mock import patch
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.migrations import Migration
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core.models import ChangeLog, Tag
+
 
 class CommandTests(TestCase):
 
     def test_wait_for_db_ready(self):
         '''Test: waiting for DB when DB is available'''
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
+        with patch.object(BaseDatabaseWrapper, 'ensure_connection') as ec, \
+                patch('time.sleep') as sleep:
+            call_command('wait_for_db', stdout=StringIO())
 
-            self.assertEqual(gi.call_count, 1)
+        self.assertEqual(ec.call_count, 1)
+        sleep.assert_not_called()
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
-        '''Test: waiting for DB'''
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command('wait_for_db')
+        '''Test: waiting for DB backs off with jittered delays'''
+        with patch.object(BaseDatabaseWrapper, 'ensure_connection') as ec:
+            ec.side_effect = [OperationalError] * 5 + [None]
+            call_command('wait_for_db', '--max-delay', '0.2',
+                         stdout=StringIO())
+
+        self.assertEqual(ec.call_count, 6)
+        self.assertEqual(ts.call_count, 5)
+        for attempt, call in enumerate(ts.call_args_list):
+            self.assertLessEqual(call[0][0], min(0.2, 0.05 * 2 ** attempt))
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        '''Test: waiting for DB fails once the timeout runs out'''
+        with patch.object(BaseDatabaseWrapper, 'ensure_connection',
+                          side_effect=OperationalError('refused')), \
+                patch('time.monotonic', side_effect=[0, 1, 2, 11]):
+            with self.assertRaisesMessage(CommandError, 'refused'):
+                call_command('wait_for_db', '--timeout', '10',
+                             stdout=StringIO())
+
+        self.assertEqual(ts.call_count, 2)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_migrations(self, ts):
+        '''Test: waiting for unapplied migrations when asked to'''
+        plan = [(Migration('0002_next', 'core'), False)]
+        with patch('core.health.MigrationExecutor') as executor, \
+                patch('core.health._migrated', set()):
+            executor.return_value.migration_plan.side_effect = [plan, []]
+            call_command('wait_for_db', '--migrations', stdout=StringIO())
+
+        self.assertEqual(ts.call_count, 1)
+
+    def test_wait_for_media(self):
+        '''Test: an unwritable media root fails the media check'''
+        with self.settings(MEDIA_ROOT='/nonexistent/media'):
+            with self.assertRaisesMessage(CommandError, 'media'):
+                call_command('wait_for_db', '--media', '--timeout', '0',
+                             stdout=StringIO())
+
+    @patch('os.execv')
+    def test_serve_execs_gunicorn(self, execv):
+        '''Test: serve replaces the process with gunicorn workers'''
+        with patch('core.management.commands.serve.cpu_count',
+                   return_value=4):
+            call_command('serve', '--bind', '127.0.0.1:9000',
+                         stdout=StringIO())
+
+        executable, argv = execv.call_args[0]
+        self.assertEqual(argv[:4], [executable, '-m', 'gunicorn',
+                                    'app.wsgi:application'])
+        self.assertEqual(argv[argv.index('--bind') + 1], '127.0.0.1:9000')
+        self.assertEqual(argv[argv.index('--workers') + 1], '9')
+
+    @patch('os.execv')
+    def test_serve_local_cache_disabled(self, execv):
+        '''Test: several workers never share a per-process response cache'''
+        local = 'django.core.cache.backends.locmem.LocMemCache'
+        shared = 'django.core.cache.backends.memcached.MemcachedCache'
+
+        for backend, workers, disabled in ((local, 3, True),
+                                           (local, 1, False),
+                                           (shared, 3, False)):
+            with self.settings(CACHES={'api': {'BACKEND': backend}}):
+                call_command('serve', '--workers', str(workers),
+                             stdout=StringIO(), stderr=StringIO())
+
+            argv = execv.call_args[0][1]
+            self.assertEqual(
+                'API_CACHE_TIMEOUT=0' in argv, disabled, (backend, workers)
+            )
+
+    @patch('os.execv')
+    def test_serve_wsgi_keep_alive(self, execv):
+        '''Test: WSGI workers are threaded so keep-alive takes effect'''
+        call_command('serve', '--threads', '8', '--keep-alive', '15',
+                     stdout=StringIO())
+
+        argv = execv.call_args[0][1]
+        self.assertEqual(argv[argv.index('--worker-class') + 1], 'gthread')
+        self.assertEqual(argv[argv.index('--threads') + 1], '8')
+        self.assertEqual(argv[argv.index('--keep-alive') + 1], '15')
+
+    @patch('os.execv')
+    def test_serve_asgi(self, execv):
+        '''Test: serving ASGI uses uvicorn workers'''
+        call_command('serve', '--interface', 'asgi', '--workers', '3',
+                     stdout=StringIO())
+
+        argv = execv.call_args[0][1]
+        self.assertIn('app.asgi:application', argv)
+        self.assertEqual(argv[argv.index('--workers') + 1], '3')
+        self.assertEqual(
+            argv[argv.index('--worker-class') + 1],
+            'uvicorn.workers.UvicornWorker'
+        )
+        self.assertNotIn('--threads', argv)
+
+    def test_compact_changes(self):
+        '''Test: compact_changes removes superseded journal entries'''
+        user = get_user_model().objects.create_user(
+            'example@example.com', 'django123!'
+        )
+        tag = Tag.objects.create(user=user, name='Vegan')
+        tag.name = 'Vegetarian'
+        tag.save()
+        out = StringIO()
+
+        call_command('compact_changes', stdout=out)
 
-            self.assertEqual(gi.call_count, 6)
+        self.assertEqual(ChangeLog.objects.count(), 1)
+        self.assertIn('Removed 1 ', out.getvalue())
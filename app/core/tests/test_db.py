@@ -0,0 +1,79 @@
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from core import db
+
+
+class FakeConnection:
+    '''Stand-in for a database connection'''
+
+    def __init__(self, usable=True, health_checks=True, connected=True):
+        self.connection = object() if connected else None
+        self.settings_dict = {'CONN_HEALTH_CHECKS': health_checks}
+        self.in_atomic_block = False
+        self.is_usable = MagicMock(return_value=usable)
+        self.close = MagicMock()
+        self.connects = 0
+
+    def ensure_connection(self):
+        self.connects += 1
+
+
+class ConnectionHealthTests(SimpleTestCase):
+
+    def start_request(self, conn):
+        '''Run the request_started health check against conn'''
+        with patch('core.db.connections') as connections:
+            connections.all.return_value = [conn]
+            db.check_connection_health()
+
+    def test_no_ping_without_query(self):
+        '''Test: a request that never uses the database is not slowed'''
+        conn = FakeConnection()
+
+        self.start_request(conn)
+
+        conn.is_usable.assert_not_called()
+
+    def test_broken_connection_closed(self):
+        '''Test: an unusable connection is closed before its first use'''
+        conn = FakeConnection(usable=False)
+
+        self.start_request(conn)
+        conn.ensure_connection()
+
+        conn.close.assert_called_once_with()
+        self.assertEqual(conn.connects, 1)
+
+    def test_checked_once_per_request(self):
+        '''Test: only the first use in a request pings the server'''
+        conn = FakeConnection()
+
+        self.start_request(conn)
+        conn.ensure_connection()
+        conn.ensure_connection()
+        self.start_request(conn)
+        conn.ensure_connection()
+
+        self.assertEqual(conn.is_usable.call_count, 2)
+        conn.close.assert_not_called()
+
+    def test_health_checks_disabled(self):
+        '''Test: connections are not pinged without CONN_HEALTH_CHECKS'''
+        conn = FakeConnection(usable=False, health_checks=False)
+
+        self.start_request(conn)
+        conn.ensure_connection()
+
+        conn.is_usable.assert_not_called()
+        conn.close.assert_not_called()
+
+    def test_unopened_connection_skipped(self):
+        '''Test: connections that are not open yet are not pinged'''
+        conn = FakeConnection(connected=False)
+
+        self.start_request(conn)
+        conn.ensure_connection()
+
+        conn.is_usable.assert_not_called()
@@ -0,0 +1,64 @@
+import tempfile
+from unittest.mock import patch
+
+from django.db.utils import OperationalError
+from django.test import TestCase
+from django.urls import reverse
+
+from core import health
+
+
+HEALTHZ_URL = reverse('healthz')
+READYZ_URL = reverse('readyz')
+
+
+class HealthEndpointTests(TestCase):
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        settings = self.settings(MEDIA_ROOT=self.media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        migrated = patch('core.health._migrated', set())
+        migrated.start()
+        self.addCleanup(migrated.stop)
+
+    def test_healthz(self):
+        '''Test: the liveness probe answers without the database'''
+        with self.assertNumQueries(0):
+            res = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b'ok')
+
+    def test_readyz_ready(self):
+        '''Test: the readiness probe passes with every check ok'''
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            res.json(), {'database': 'ok', 'migrations': 'ok', 'media': 'ok'}
+        )
+        self.assertIn('no-cache', res['Cache-Control'])
+
+    def test_readyz_checks_migrations_once(self):
+        '''Test: a migrated database is not checked again'''
+        self.client.get(READYZ_URL)
+
+        with patch('core.health.MigrationExecutor') as executor:
+            self.client.get(READYZ_URL)
+
+        executor.assert_not_called()
+
+    def test_readyz_not_ready(self):
+        '''Test: failed checks are named in a 503 without details'''
+        with patch.object(health.connections['default'], 'ensure_connection',
+                          side_effect=OperationalError('secret host')), \
+                self.settings(MEDIA_ROOT='/nonexistent/media'):
+            res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['database'], 'failed')
+        self.assertEqual(res.json()['media'], 'failed')
+        self.assertNotIn(b'secret', res.content)
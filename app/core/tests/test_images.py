@@ -0,0 +1,197 @@
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import images
+from core.models import ChangeLog, ImageJob, Recipe
+from recipe.cache import get_user_version
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def sample_image(size=(800, 600), fmt='JPEG', orientation=None):
+    '''Return the bytes of a generated image'''
+    buffer = io.BytesIO()
+    image = Image.new('RGB', size, color=(200, 80, 40))
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    image.save(buffer, fmt, exif=exif.tobytes())
+
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT,
+                   IMAGE_RENDITION_WIDTHS=(320, 640, 1280))
+class ImagePipelineTests(TestCase):
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            'example@example.com',
+            'django123!'
+        )
+        self.recipe = Recipe.objects.create(
+            user=user,
+            title='Sample Recipe',
+            time_minutes=10,
+            price=5.00
+        )
+        self.recipe.image.save('photo.jpg', ContentFile(sample_image()))
+
+    def tearDown(self):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_rendition_path_deterministic(self):
+        '''Test: rendition paths derive from the source file name'''
+        path = images.rendition_path('uploads/recipe/abc.jpg', 320, 'webp')
+
+        self.assertEqual(path, 'uploads/recipe/renditions/abc/320w.webp')
+
+    def test_process_job_builds_renditions(self):
+        '''Test: processing a job stores resized renditions on the recipe'''
+        images.enqueue_image_job(self.recipe)
+
+        processed = images.process_pending_jobs()
+
+        self.assertEqual(processed, 1)
+        self.recipe.refresh_from_db()
+        jpeg = self.recipe.renditions['jpeg']
+        self.assertEqual(sorted(jpeg), ['320', '640'])
+        with default_storage.open(jpeg['320']) as fh:
+            self.assertEqual(Image.open(fh).size, (320, 240))
+        job = ImageJob.objects.get()
+        self.assertEqual(job.status, ImageJob.DONE)
+        self.assertEqual(job.attempts, 1)
+
+    def test_renditions_follow_exif_orientation(self):
+        '''Test: a photo stored sideways by the camera is rendered upright'''
+        self.recipe.image.save(
+            'portrait.jpg', ContentFile(sample_image(orientation=6))
+        )
+        images.enqueue_image_job(self.recipe)
+
+        images.process_pending_jobs()
+
+        self.recipe.refresh_from_db()
+        with default_storage.open(self.recipe.renditions['jpeg']['320']) as fh:
+            self.assertEqual(Image.open(fh).size, (320, 427))
+
+    def test_process_job_overwrites_existing_renditions(self):
+        '''Test: reprocessing writes to the same deterministic paths'''
+        images.enqueue_image_job(self.recipe)
+        images.process_pending_jobs()
+        self.recipe.refresh_from_db()
+        first = self.recipe.renditions
+
+        images.enqueue_image_job(self.recipe)
+        images.process_pending_jobs()
+        self.recipe.refresh_from_db()
+
+        self.assertEqual(self.recipe.renditions, first)
+
+    def test_superseded_job_skipped(self):
+        '''Test: a job for a replaced image does not overwrite renditions'''
+        job = images.enqueue_image_job(self.recipe)
+        self.recipe.image.save('newer.jpg', ContentFile(sample_image()))
+
+        with patch('core.images.build_renditions') as build:
+            images.process_pending_jobs()
+
+        build.assert_not_called()
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.DONE)
+
+    def test_image_replaced_during_resize(self):
+        '''Test: renditions of an image replaced mid-job are discarded'''
+        images.enqueue_image_job(self.recipe)
+        build = images.build_renditions
+
+        def replace_then_build(source):
+            Recipe.objects.filter(pk=self.recipe.pk).update(
+                image='uploads/recipe/newer.jpg'
+            )
+            return build(source)
+
+        with patch('core.images.build_renditions', replace_then_build):
+            images.process_pending_jobs()
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.renditions, {})
+        self.assertEqual(ImageJob.objects.get().status, ImageJob.DONE)
+
+    def test_renditions_journalled(self):
+        '''Test: new renditions reach sync clients and cached lists'''
+        images.enqueue_image_job(self.recipe)
+        ChangeLog.objects.all().delete()
+        version = get_user_version(self.recipe.user_id)
+
+        images.process_pending_jobs()
+
+        self.assertEqual(
+            list(ChangeLog.objects.values_list('object_id', flat=True)),
+            [self.recipe.pk]
+        )
+        self.assertNotEqual(get_user_version(self.recipe.user_id), version)
+
+    def test_failed_job_retried_then_failed(self):
+        '''Test: a failing job is retried up to the attempt limit'''
+        images.enqueue_image_job(self.recipe)
+
+        with patch('core.images.build_renditions',
+                   side_effect=OSError('broken')):
+            with self.settings(IMAGE_JOB_MAX_ATTEMPTS=2):
+                images.process_pending_jobs()
+                job = ImageJob.objects.get()
+                self.assertEqual(job.status, ImageJob.PENDING)
+
+                images.process_pending_jobs()
+                job.refresh_from_db()
+
+        self.assertEqual(job.status, ImageJob.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIn('broken', job.last_error)
+
+    def test_stale_running_job_reclaimed(self):
+        '''Test: a job abandoned by a crashed worker is claimed again'''
+        job = images.enqueue_image_job(self.recipe)
+        ImageJob.objects.filter(id=job.id).update(
+            status=ImageJob.RUNNING,
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+
+        jobs = images.claim_jobs(10)
+
+        self.assertEqual([claimed.id for claimed in jobs], [job.id])
+
+    def test_running_job_not_claimed_twice(self):
+        '''Test: a job being processed is not handed to another worker'''
+        images.enqueue_image_job(self.recipe)
+        images.claim_jobs(10)
+
+        self.assertEqual(images.claim_jobs(10), [])
+
+    def test_worker_command_once(self):
+        '''Test: the worker command drains the queue and exits'''
+        images.enqueue_image_job(self.recipe)
+
+        call_command('process_image_jobs', '--once', stdout=io.StringIO())
+
+        self.assertFalse(
+            ImageJob.objects.exclude(status=ImageJob.DONE).exists()
+        )
+        self.assertTrue(os.path.isdir(
+            os.path.join(MEDIA_ROOT, 'uploads/recipe/renditions')
+        ))
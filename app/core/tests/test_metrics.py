@@ -0,0 +1,188 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.metrics import Histogram, registry
+from core.models import Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+METRICS_URL = reverse('metrics')
+
+
+def sample_values(body, name, view, method='GET'):
+    '''Return the {suffix: value} samples of one metric series'''
+    labels = f'view="{view}",method="{method}"'
+    values = {}
+    for line in body.splitlines():
+        metric, _, value = line.rpartition(' ')
+        if metric.startswith(name) and labels in metric:
+            values[metric[len(name):].replace(labels, '')] = float(value)
+
+    return values
+
+
+class HistogramTests(TestCase):
+
+    def test_buckets(self):
+        '''Test: values land in the first bucket bound above them'''
+        histogram = Histogram((1, 2, 4))
+        for value in (0, 1, 1.5, 3, 100):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.counts, [2, 1, 1, 1])
+        self.assertEqual(histogram.count, 5)
+        self.assertEqual(histogram.sum, 105.5)
+
+
+class MetricsMiddlewareTests(TestCase):
+
+    def setUp(self):
+        registry.clear()
+        self.addCleanup(registry.clear)
+        self.user = get_user_model().objects.create_user(
+            'example@example.com',
+            'django123!'
+        )
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=5
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_records_per_view(self):
+        '''Test: queries and latency are recorded per view and method'''
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(RECIPES_URL)
+        expected = len(queries)
+        first = self.client.get(METRICS_URL).content.decode()
+        self.client.get(RECIPES_URL, {'fields': 'id'})
+
+        body = self.client.get(METRICS_URL).content.decode()
+
+        count = sample_values(
+            body, 'api_request_duration_seconds_count', 'recipe:recipe-list'
+        )
+        self.assertEqual(count, {'{}': 2})
+        buckets = sample_values(
+            body, 'api_db_queries_bucket', 'recipe:recipe-list'
+        )
+        self.assertEqual(buckets['{,le="+Inf"}'], 2)
+        self.assertEqual(
+            sample_values(first, 'api_db_queries_sum', 'recipe:recipe-list'),
+            {'{}': expected}
+        )
+        serialize = sample_values(
+            body, 'api_serialize_duration_seconds_count',
+            'recipe:recipe-list'
+        )
+        self.assertEqual(serialize, {'{}': 2})
+
+    def test_prometheus_format(self):
+        '''Test: the endpoint serves histograms in the text format'''
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        body = res.content.decode()
+        self.assertIn('# TYPE api_db_queries histogram', body)
+        buckets = list(sample_values(
+            body, 'api_request_duration_seconds_bucket',
+            'recipe:recipe-list'
+        ).values())
+        self.assertEqual(buckets, sorted(buckets))
+
+    def test_server_timing(self):
+        '''Test: Server-Timing is only sent when enabled'''
+        res = self.client.get(RECIPES_URL)
+        self.assertNotIn('Server-Timing', res)
+
+        with self.settings(METRICS_SERVER_TIMING=True):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertRegex(
+            res['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="\d+ queries", serialize;dur=[\d.]+, '
+            r'total;dur=[\d.]+$'
+        )
+
+    def test_unresolved_paths_share_a_series(self):
+        '''Test: unknown URLs do not create a series per path'''
+        self.client.get('/nope/1')
+        self.client.get('/nope/2')
+
+        body = self.client.get(METRICS_URL).content.decode()
+
+        self.assertEqual(
+            sample_values(
+                body, 'api_request_duration_seconds_count', '<unresolved>'
+            ),
+            {'{}': 2}
+        )
+
+    def test_unknown_methods_share_a_series(self):
+        '''Test: made up methods do not create a series each'''
+        self.client.generic('BREW', RECIPES_URL)
+        self.client.generic('"}\nX', RECIPES_URL)
+
+        body = self.client.get(METRICS_URL).content.decode()
+
+        self.assertEqual(
+            sample_values(
+                body, 'api_request_duration_seconds_count',
+                'recipe:recipe-list', method='OTHER'
+            ),
+            {'{}': 2}
+        )
+        self.assertNotIn('BREW', body)
+
+    def test_disabled(self):
+        '''Test: nothing is recorded when metrics are disabled'''
+        with self.settings(METRICS_ENABLED=False):
+            client = APIClient()
+            client.force_authenticate(self.user)
+            client.get(RECIPES_URL)
+
+        self.assertNotIn('recipe:recipe-list', registry.render())
+
+
+class MetricsAccessTests(TestCase):
+    '''Test who may read the metrics endpoint'''
+
+    def test_public_address_forbidden(self):
+        '''Test: clients outside the allowed networks are refused'''
+        res = self.client.get(METRICS_URL, REMOTE_ADDR='203.0.113.7')
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_allowed_network(self):
+        '''Test: clients in an allowed network are served'''
+        with self.settings(METRICS_ALLOWED_NETWORKS=['10.0.0.0/8']):
+            allowed = self.client.get(METRICS_URL, REMOTE_ADDR='10.1.2.3')
+            loopback = self.client.get(METRICS_URL)
+
+        self.assertEqual(allowed.status_code, status.HTTP_200_OK)
+        self.assertEqual(loopback.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_token(self):
+        '''Test: the metrics token opens the endpoint from anywhere'''
+        served = self.client.get(
+            METRICS_URL, REMOTE_ADDR='203.0.113.7',
+            HTTP_AUTHORIZATION='Bearer s3cret'
+        )
+        refused = self.client.get(
+            METRICS_URL, REMOTE_ADDR='203.0.113.7',
+            HTTP_AUTHORIZATION='Bearer wrong'
+        )
+
+        self.assertEqual(served.status_code, status.HTTP_200_OK)
+        self.assertEqual(refused.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,86 @@
+import datetime
+import io
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+PAYLOADS = (
+    {'price': Decimal('7.50'), 'tax': Decimal('0.1000')},
+    OrderedDict([('title', 'Crème brûlée    "x" \\ \x00\x1f'),
+                 ('emoji', '\U0001f373')]),
+    [datetime.datetime(2020, 8, 22, 21, 29, 1, 123456,
+                       tzinfo=datetime.timezone.utc),
+     datetime.date(2020, 8, 22), datetime.time(21, 29, 1, 500),
+     datetime.timedelta(minutes=90)],
+    {'id': uuid.UUID(int=1), 'lazy': gettext_lazy('Not found.')},
+    {1: 'int key', 'nested': [{'a': None, 'b': True}, 1.5, -0.0, 10 ** 30]},
+    [1e16, 1e-7, Decimal('1E+22'), 'take 1e5 eggs'],
+    [],
+)
+
+
+class FastJSONRendererTests(SimpleTestCase):
+
+    def test_render_matches_json_renderer(self):
+        '''Test: the fast renderer output is byte identical to DRF's'''
+        for data in PAYLOADS:
+            with self.subTest(data=data):
+                self.assertEqual(
+                    FastJSONRenderer().render(data),
+                    JSONRenderer().render(data)
+                )
+
+    def test_render_indented(self):
+        '''Test: indented output is delegated to JSONRenderer'''
+        data = {'a': [1, 2]}
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            FastJSONRenderer().render(data, media_type),
+            JSONRenderer().render(data, media_type)
+        )
+
+    def test_render_none(self):
+        '''Test: no data renders as an empty body'''
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+class FastJSONParserTests(SimpleTestCase):
+
+    def parse(self, parser, body):
+        '''Parse body with parser'''
+        return parser.parse(io.BytesIO(body))
+
+    def test_parse_matches_json_parser(self):
+        '''Test: the fast parser returns the same data as DRF's'''
+        for body in (b'{"title": "Cr\\u00e8me", "price": 4.5}',
+                     '[{"a": "ü"}, null, true]'.encode(),
+                     b'123456789012345678901234567890'):
+            with self.subTest(body=body):
+                self.assertEqual(
+                    self.parse(FastJSONParser(), body),
+                    self.parse(JSONParser(), body)
+                )
+
+    def test_parse_errors_match_json_parser(self):
+        '''Test: invalid JSON fails with DRF's error message'''
+        for body in (b'{"a": ', b'[NaN]', b''):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError) as expected:
+                    self.parse(JSONParser(), body)
+                with self.assertRaises(ParseError) as actual:
+                    self.parse(FastJSONParser(), body)
+
+                self.assertEqual(
+                    str(actual.exception), str(expected.exception)
+                )
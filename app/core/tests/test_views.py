@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase
+
+from core.views import serve_file
+
+
+class ServeFileTests(SimpleTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'uploads'))
+        with open(os.path.join(self.root, 'uploads', 'a b.jpg'), 'wb') as fh:
+            fh.write(b'jpeg')
+        self.request = RequestFactory().get('/media/uploads/a%20b.jpg')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_serve_file_response(self):
+        '''Test: files are returned as a FileResponse without a proxy'''
+        res = serve_file(self.request, 'uploads/a b.jpg', self.root)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.streaming)
+        self.assertEqual(b''.join(res.streaming_content), b'jpeg')
+        res.close()
+
+    def test_serve_file_accel_redirect(self):
+        '''Test: with a proxy location only the redirect header is sent'''
+        res = serve_file(
+            self.request, 'uploads/a b.jpg', self.root, '/protected/'
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['X-Accel-Redirect'],
+                         '/protected/uploads/a%20b.jpg')
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+
+    def test_serve_file_missing(self):
+        '''Test: missing files are not handed to the proxy'''
+        with self.assertRaises(Http404):
+            serve_file(self.request, 'uploads/nope.jpg', self.root, '/p/')
+
+    def test_serve_file_outside_root(self):
+        '''Test: paths cannot escape the document root'''
+        with self.assertRaises(SuspiciousFileOperation):
+            serve_file(self.request, '../../etc/passwd', self.root, '/p/')
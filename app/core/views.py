@@ -0,0 +1,103 @@
+import hmac
+import ipaddress
+import mimetypes
+import os
+import posixpath
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden, \
+                        JsonResponse
+from django.utils._os import safe_join
+from django.views import static
+from django.views.decorators.cache import never_cache
+
+from core.health import READINESS_CHECKS, NotReady
+from core.metrics import registry
+
+
+def serve_file(request, path, document_root, accel_prefix=''):
+    '''Serve a file below document_root without streaming it in Python
+
+    With accel_prefix set, the response only carries an X-Accel-Redirect
+    header and the front proxy (nginx `internal` location) sends the file
+    with sendfile. Otherwise Django's FileResponse is used, which WSGI
+    servers pass to wsgi.file_wrapper and sendfile().
+    '''
+    if not accel_prefix:
+        return static.serve(request, path, document_root=document_root)
+
+    path = posixpath.normpath(path).lstrip('/')
+    fullpath = safe_join(document_root, path)
+    if not os.path.isfile(fullpath):
+        raise Http404('"%(path)s" does not exist' % {'path': path})
+
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    response = HttpResponse(
+        content_type=content_type or 'application/octet-stream'
+    )
+    response['X-Accel-Redirect'] = (
+        accel_prefix.rstrip('/') + '/' + quote(path)
+    )
+    if encoding:
+        response['Content-Encoding'] = encoding
+
+    return response
+
+
+@never_cache
+def healthz(request):
+    '''Liveness probe: answers as long as the process serves requests'''
+    return HttpResponse('ok', content_type='text/plain')
+
+
+@never_cache
+def readyz(request):
+    '''Readiness probe: 503 naming the failed checks until all pass
+
+    Failure details stay in the logs of `manage.py wait_for_db`, not in
+    this unauthenticated response.
+    '''
+    results = {}
+    for name, check in READINESS_CHECKS:
+        try:
+            check()
+            results[name] = 'ok'
+        except NotReady:
+            results[name] = 'failed'
+    ready = all(result == 'ok' for result in results.values())
+
+    return JsonResponse(results, status=200 if ready else 503)
+
+
+def _may_scrape(request):
+    '''Return whether the client may read the metrics'''
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and hmac.compare_digest(header, f'Bearer {token}'):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in settings.METRICS_ALLOWED_NETWORKS
+    )
+
+
+@never_cache
+def metrics(request):
+    '''Serve this process's request histograms to Prometheus
+
+    Latency and query figures per view are not for the public, so only
+    allowed networks and holders of the metrics token are served.
+    '''
+    if not _may_scrape(request):
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,222 @@
+from django.db import connection, transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.relations import PrimaryKeyRelatedField
+
+from core.journal import record_changes
+from core.models import ChangeLog, ImageJob, Ingredient, Recipe, Tag
+from core.search import update_search_vectors
+from recipe.cache import bump_user_version
+from recipe.serializers import RecipeBulkSerializer
+
+
+BATCH_SIZE = 500
+
+RELATIONS = (
+    ('ingredients', Ingredient, Recipe.ingredients.through, 'ingredient_id'),
+    ('tags', Tag, Recipe.tags.through, 'tag_id'),
+)
+
+SCALAR_FIELDS = ('title', 'time_minutes', 'price', 'link')
+
+DOES_NOT_EXIST = PrimaryKeyRelatedField.default_error_messages[
+    'does_not_exist'
+]
+
+
+def _validate_items(user, items, partial=False):
+    '''Validate every item, returning cleaned data and per-item errors
+
+    Field validation runs per item, then all tag and ingredient IDs are
+    checked with one query per model, scoped to the user.
+    '''
+    serializer = RecipeBulkSerializer(partial=partial)
+    cleaned, errors = [], []
+    for item in items:
+        try:
+            cleaned.append(serializer.run_validation(item))
+            errors.append({})
+        except ValidationError as exc:
+            cleaned.append(None)
+            errors.append(exc.detail)
+
+    for name, model, through, column in RELATIONS:
+        ids = {
+            pk for data in cleaned if data for pk in data.get(name, ())
+        }
+        found = set(
+            model.objects.filter(user=user, id__in=ids)
+            .values_list('id', flat=True)
+        ) if ids else set()
+        for data, error in zip(cleaned, errors):
+            missing = [
+                pk for pk in dict.fromkeys((data or {}).get(name, ()))
+                if pk not in found
+            ]
+            if missing:
+                error[name] = [
+                    DOES_NOT_EXIST.format(pk_value=pk) for pk in missing
+                ]
+
+    return cleaned, errors
+
+
+def _set_relations(recipes_data):
+    '''Replace the relations given for each (recipe, data) pair'''
+    for name, model, through, column in RELATIONS:
+        pairs = [
+            (recipe, data[name])
+            for recipe, data in recipes_data if name in data
+        ]
+        if not pairs:
+            continue
+        through.objects.filter(
+            recipe_id__in=[recipe.id for recipe, ids in pairs]
+        ).delete()
+        through.objects.bulk_create(
+            [
+                through(recipe_id=recipe.id, **{column: pk})
+                for recipe, ids in pairs
+                for pk in dict.fromkeys(ids)
+            ],
+            batch_size=BATCH_SIZE
+        )
+
+
+def _refetch(recipes):
+    '''Reload recipes with the relations RecipeSerializer renders'''
+    return Recipe.objects.filter(
+        id__in=[recipe.id for recipe in recipes]
+    ).order_by('id').prefetch_related(
+        Prefetch('ingredients', Ingredient.objects.only('id')),
+        Prefetch('tags', Tag.objects.only('id')),
+    )
+
+
+def create_recipes(user, items):
+    '''Create recipes for user from a list of payloads
+
+    Returns (recipes, errors); nothing is written unless every item is
+    valid.
+    '''
+    cleaned, errors = _validate_items(user, items)
+    if any(errors):
+        return None, errors
+
+    recipes = [
+        Recipe(user=user, **{
+            field: data[field] for field in SCALAR_FIELDS if field in data
+        })
+        for data in cleaned
+    ]
+    with transaction.atomic():
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes, batch_size=BATCH_SIZE)
+        else:
+            # Backends that cannot return the new primary keys from a
+            # batch insert fall back to one INSERT per recipe
+            for recipe in recipes:
+                recipe.save()
+        _set_relations(list(zip(recipes, cleaned)))
+        # bulk_create bypasses the signals that keep search vectors and
+        # the change journal fresh
+        update_search_vectors(
+            Recipe.objects.filter(id__in=[recipe.id for recipe in recipes])
+        )
+        record_changes(
+            user.id, ChangeLog.RECIPE, [recipe.id for recipe in recipes]
+        )
+    bump_user_version(user.id)
+
+    return _refetch(recipes), errors
+
+
+def update_recipes(user, items):
+    '''Partially update the user's recipes from a list of payloads
+
+    Each payload must contain the recipe `id`. Returns (recipes, errors).
+    '''
+    cleaned, errors = _validate_items(user, items, partial=True)
+    ids = [data['id'] for data in cleaned if data and 'id' in data]
+    existing = Recipe.objects.filter(user=user, id__in=ids).in_bulk()
+    seen = set()
+    for data, error in zip(cleaned, errors):
+        if data is None:
+            continue
+        if 'id' not in data:
+            error['id'] = ['This field is required.']
+        elif data['id'] not in existing:
+            error['id'] = ['Not found.']
+        elif data['id'] in seen:
+            # Relations would be inserted twice for the same recipe
+            error['id'] = ['Duplicate recipe in this request.']
+        else:
+            seen.add(data['id'])
+    if any(errors):
+        return None, errors
+
+    now = timezone.now()
+    fields = {'updated_at'}
+    recipes_data = []
+    for data in cleaned:
+        recipe = existing[data['id']]
+        for field in SCALAR_FIELDS:
+            if field in data:
+                setattr(recipe, field, data[field])
+                fields.add(field)
+        recipe.updated_at = now
+        recipes_data.append((recipe, data))
+    recipes = [recipe for recipe, data in recipes_data]
+
+    with transaction.atomic():
+        Recipe.objects.bulk_update(
+            recipes, sorted(fields), batch_size=BATCH_SIZE
+        )
+        _set_relations(recipes_data)
+        update_search_vectors(
+            Recipe.objects.filter(id__in=[recipe.id for recipe in recipes])
+        )
+        record_changes(
+            user.id, ChangeLog.RECIPE, [recipe.id for recipe in recipes]
+        )
+    bump_user_version(user.id)
+
+    return _refetch(recipes), errors
+
+
+def delete_recipes(user, ids):
+    '''Delete the user's recipes with the given IDs
+
+    Returns (count, errors); nothing is deleted if any ID is unknown.
+    '''
+    errors = []
+    for pk in ids:
+        errors.append(
+            {} if isinstance(pk, int) and not isinstance(pk, bool)
+            else {'id': ['A valid integer is required.']}
+        )
+    if any(errors):
+        return None, errors
+
+    found = set(
+        Recipe.objects.filter(user=user, id__in=ids)
+        .values_list('id', flat=True)
+    )
+    errors = [{} if pk in found else {'id': ['Not found.']} for pk in ids]
+    if any(errors):
+        return None, errors
+
+    with transaction.atomic():
+        # One DELETE per table: the collector would send post_delete per
+        # recipe, journalling and invalidating one recipe at a time
+        for name, model, through, column in RELATIONS:
+            through.objects.filter(recipe_id__in=found).delete()
+        ImageJob.objects.filter(recipe_id__in=found).delete()
+        Recipe.objects.filter(user=user, id__in=found)._raw_delete(
+            connection.alias
+        )
+        record_changes(user.id, ChangeLog.RECIPE, ids, deleted=True)
+    bump_user_version(user.id)
+
+    return len(found), errors
@@ -0,0 +1,88 @@
+import calendar
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    '''Answer conditional GETs for recipes before serialization runs
+
+    Validators come from an aggregate over `updated_at` on the filtered
+    queryset, so an unchanged resource costs one aggregate query and
+    returns 304 Not Modified without loading or serializing any rows.
+    '''
+
+    def _get_validators(self, queryset):
+        '''Return the row count and latest update time of the queryset'''
+        return queryset.aggregate(count=Count('id'), updated=Max('updated_at'))
+
+    def _make_etag(self, request, validators):
+        '''Build a strong ETag for this user, URL and representation'''
+        updated = validators['updated']
+        source = ':'.join((
+            str(request.user.id),
+            request.get_full_path(),
+            request.accepted_media_type,
+            str(validators['count']),
+            updated.isoformat() if updated else '',
+        ))
+
+        return quote_etag(hashlib.sha1(source.encode()).hexdigest())
+
+    def _conditional(self, request, etag, last_modified, handler,
+                     *args, **kwargs):
+        '''Return 304 if the client copy is fresh, else call handler'''
+        timestamp = None
+        if last_modified:
+            timestamp = calendar.timegm(last_modified.utctimetuple())
+
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=timestamp
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp:
+                response['Last-Modified'] = http_date(timestamp)
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        '''List with an ETag over the filtered queryset
+
+        No Last-Modified is sent for lists: deleting a row does not move
+        the latest `updated_at`, so If-Modified-Since would miss deletes.
+        '''
+        queryset = self.filter_queryset(self.get_queryset())
+        validators = self._get_validators(queryset)
+        etag = self._make_etag(request, validators)
+
+        return self._conditional(
+            request, etag, None, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        '''Retrieve with an ETag and Last-Modified from the row'''
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            validators = self._get_validators(queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            ))
+        except (TypeError, ValueError, ValidationError):
+            # A malformed ID; let retrieve answer 404 as for a missing one
+            validators = {'count': 0}
+        if not validators['count']:
+            return super().retrieve(request, *args, **kwargs)
+        etag = self._make_etag(request, validators)
+
+        return self._conditional(
+            request, etag, validators['updated'], super().retrieve,
+            *args, **kwargs
+        )
@@ -0,0 +1,146 @@
+import itertools
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from core.journal import record_changes
+from core.models import ChangeLog, Ingredient, Recipe, Tag
+from core.search import update_search_vectors
+from recipe.cache import bump_user_version
+
+
+BATCH_SIZE = 5000
+
+RECIPE_DEFAULTS = {
+    'time_minutes': 10,
+    'price': Decimal('5.00'),
+}
+
+_users = itertools.count()
+
+
+def _bulk_create(model, objs):
+    '''Insert objs in batches and return them with primary keys set
+
+    Backends that cannot return keys from a batch insert (SQLite) get
+    them read back: inside the transaction the new rows are the highest
+    keys, in insert order.
+    '''
+    with transaction.atomic():
+        model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+        if objs and objs[0].pk is None:
+            pks = model.objects.order_by('-pk').values_list(
+                'pk', flat=True
+            )[:len(objs)]
+            for obj, pk in zip(objs, reversed(list(pks))):
+                obj.pk = pk
+
+    return objs
+
+
+def _names(names, prefix):
+    '''Return names, or that many numbered names if given a count'''
+    if isinstance(names, int):
+        return [f'{prefix} {i}' for i in range(names)]
+
+    return list(names)
+
+
+def create_users(n, password=None, **fields):
+    '''Create n users with unique emails
+
+    The password is hashed once for all of them, so even the production
+    hasher only costs one hash; None gives unusable passwords.
+    '''
+    batch = next(_users)
+    hashed = make_password(password)
+    users = _bulk_create(get_user_model(), [
+        get_user_model()(
+            email=f'user-{batch}-{i}@example.com', password=hashed, **fields
+        )
+        for i in range(n)
+    ])
+    for user in users:
+        bump_user_version(user.pk)
+
+    return users
+
+
+def create_tags(user, names):
+    '''Create tags for user from a list of names, or a count'''
+    tags = _bulk_create(
+        Tag, [Tag(user=user, name=name) for name in _names(names, 'Tag')]
+    )
+    record_changes(user.pk, ChangeLog.TAG, [tag.pk for tag in tags])
+    bump_user_version(user.pk)
+
+    return tags
+
+
+def create_ingredients(user, names):
+    '''Create ingredients for user from a list of names, or a count'''
+    ingredients = _bulk_create(Ingredient, [
+        Ingredient(user=user, name=name)
+        for name in _names(names, 'Ingredient')
+    ])
+    record_changes(
+        user.pk, ChangeLog.INGREDIENT, [item.pk for item in ingredients]
+    )
+    bump_user_version(user.pk)
+
+    return ingredients
+
+
+def create_recipes(user, n, tags=(), ingredients=(), **fields):
+    '''Create n recipes for user with their tag and ingredient links
+
+    `tags` and `ingredients` are the objects or IDs to link to every
+    recipe. Other keyword arguments are model field values; titles
+    default to "Recipe <index>". Any of these may instead be a callable
+    returning the value for the recipe's index. Search vectors, the
+    change journal and the user's response cache are updated as the API
+    would.
+    '''
+    values = {
+        'title': lambda i: f'Recipe {i}', **RECIPE_DEFAULTS, **fields
+    }
+    with transaction.atomic():
+        recipes = _bulk_create(Recipe, [
+            Recipe(user=user, **{
+                name: value(i) if callable(value) else value
+                for name, value in values.items()
+            })
+            for i in range(n)
+        ])
+        if not recipes:
+            return recipes
+
+        for field, related in (('tags', tags), ('ingredients', ingredients)):
+            through = getattr(Recipe, field).through
+            column = getattr(Recipe, field).field.m2m_reverse_name()
+            pick = related if callable(related) else lambda i: related
+            through.objects.bulk_create([
+                through(recipe_id=recipe.pk, **{
+                    column: getattr(obj, 'pk', obj)
+                })
+                for i, recipe in enumerate(recipes)
+                for obj in dict.fromkeys(pick(i))
+            ], batch_size=BATCH_SIZE)
+
+        # A key range rather than an IN list of every new ID
+        update_search_vectors(Recipe.objects.filter(
+            user=user, pk__gte=recipes[0].pk, pk__lte=recipes[-1].pk
+        ))
+        record_changes(
+            user.pk, ChangeLog.RECIPE, [recipe.pk for recipe in recipes]
+        )
+    bump_user_version(user.pk)
+
+    return recipes
+
+
+def create_recipe(user, **fields):
+    '''Create and return one recipe for user, as create_recipes would'''
+    return create_recipes(user, 1, **fields)[0]
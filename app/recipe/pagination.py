@@ -0,0 +1,134 @@
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+def _reverse(ordering):
+    '''Return ordering with every field's direction flipped'''
+    return tuple(
+        name[1:] if name.startswith('-') else f'-{name}'
+        for name in ordering
+    )
+
+
+class RecipeCursorPagination(CursorPagination):
+    '''Keyset pagination for recipes, newest first
+
+    DRF's cursor holds the first ordering field only and steps over ties
+    with an OFFSET capped at offset_cutoff, so a heavily tied ranking
+    repeats rows and never ends. Here the cursor holds every ordering
+    field; the ordering always ends in a unique one, so the position
+    names a single row and pages never need an offset.
+    '''
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+
+    # Annotations the recipe view adds to rank results, most significant
+    # first; results are ordered by those present, then newest first
+    rankings = ('matched_ingredients', 'rank')
+
+    @property
+    def max_page_size(self):
+        '''Read the cap per request so it follows the settings'''
+        return settings.API_MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        '''Order ranked results by their rankings, then newest first'''
+        annotations = queryset.query.annotations
+        ranked = tuple(
+            f'-{name}' for name in self.rankings if name in annotations
+        )
+        if ranked:
+            return ranked + ('-id',)
+
+        return super().get_ordering(request, queryset, view)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        '''Return the page of rows following the cursor position'''
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self._decode_position()
+
+        ordering = _reverse(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._following(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=False, position=self._position(self.page[-1])
+        ))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=True, position=self._position(self.page[0])
+        ))
+
+    def _position(self, row):
+        '''Encode the values of every ordering field of row'''
+        values = [
+            row[name] if isinstance(row, dict) else getattr(row, name)
+            for name in (order.lstrip('-') for order in self.ordering)
+        ]
+
+        return json.dumps(values, separators=(',', ':'))
+
+    def _decode_position(self):
+        '''Return the cursor's position as a list of values, or None'''
+        if self.cursor is None or self.cursor.position is None:
+            return None
+        try:
+            position = json.loads(self.cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if (not isinstance(position, list) or
+                len(position) != len(self.ordering)):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position
+
+    def _following(self, ordering, position):
+        '''Return a filter for the rows after position in ordering'''
+        condition = Q()
+        ties = {}
+        for order, value in zip(ordering, position):
+            name = order.lstrip('-')
+            lookup = 'lt' if order.startswith('-') else 'gt'
+            condition |= Q(**ties, **{f'{name}__{lookup}': value})
+            ties[name] = value
+
+        return condition
+
+
+class RecipeAttrCursorPagination(RecipeCursorPagination):
+    '''Keyset pagination for tags and ingredients, by name'''
+    ordering = ('-name', 'id')
@@ -0,0 +1,191 @@
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from rest_framework import exceptions
+from rest_framework.response import Response
+
+from core.metrics import timed_serialization
+from core.models import Recipe
+from recipe import serializers
+
+
+SCALAR_FIELDS = ('id', 'title', 'time_minutes', 'price', 'link')
+
+RELATIONS = (
+    ('ingredients', Recipe.ingredients.through, 'ingredient'),
+    ('tags', Recipe.tags.through, 'tag'),
+)
+
+LIST_FIELDS = ('id', 'title', 'ingredients', 'tags', 'time_minutes',
+               'price', 'link')
+
+DETAIL_FIELDS = LIST_FIELDS + ('renditions',)
+
+EXPANDABLE = tuple(name for name, through, field in RELATIONS)
+
+
+class RecipeReader:
+    '''Build recipe representations straight from .values() rows
+
+    Produces the same output as RecipeSerializer and
+    RecipeDetailSerializer without per-field serializer dispatch:
+    relations come from one through-table query each, in id order, and
+    only `price` and `renditions` go through their serializer fields.
+
+    `fields` narrows the output (and the columns and relations loaded)
+    to a subset, in the serializer's order; `expand` renders the named
+    relations of list rows as nested objects, as the detail does.
+    '''
+
+    def __init__(self, context, detail=False, fields=None, expand=()):
+        self.detail = detail
+        serializer_class = (
+            serializers.RecipeDetailSerializer if detail
+            else serializers.RecipeSerializer
+        )
+        available = DETAIL_FIELDS if detail else LIST_FIELDS
+        self.fields = tuple(
+            name for name in available if fields is None or name in fields
+        )
+        self.nested = set(EXPANDABLE) if detail else set(expand)
+        serializer_fields = serializer_class(context=context).fields
+        self.price_field = serializer_fields['price']
+        self.renditions_field = serializer_fields.get('renditions')
+
+    def values(self, queryset):
+        '''Return queryset as the rows this reader consumes
+
+        Annotations are kept so cursor pagination can read the ranking
+        its ordering starts with.
+        '''
+        fields = ('id',) + tuple(
+            name for name in self.fields
+            if name != 'id' and name in SCALAR_FIELDS + ('renditions',)
+        ) + tuple(queryset.query.annotations)
+
+        return queryset.prefetch_related(None).values(*fields)
+
+    def _relations(self, recipe_ids):
+        '''Return {name: {recipe_id: [related]}} for the recipes'''
+        relations = {}
+        for name, through, field in RELATIONS:
+            if name not in self.fields:
+                continue
+            related = {recipe_id: [] for recipe_id in recipe_ids}
+            rows = through.objects.filter(
+                recipe_id__in=recipe_ids
+            ).order_by(f'{field}_id')
+            if name in self.nested:
+                for recipe_id, pk, value in rows.values_list(
+                    'recipe_id', f'{field}_id', f'{field}__name'
+                ):
+                    related[recipe_id].append({'id': pk, 'name': value})
+            else:
+                for recipe_id, pk in rows.values_list(
+                    'recipe_id', f'{field}_id'
+                ):
+                    related[recipe_id].append(pk)
+            relations[name] = related
+
+        return relations
+
+    @timed_serialization
+    def represent(self, rows):
+        '''Return the representation of every row, in row order'''
+        rows = list(rows)
+        relations = self._relations([row['id'] for row in rows])
+        to_price = self.price_field.to_representation
+        converters = {'price': to_price}
+        if self.renditions_field is not None:
+            converters['renditions'] = self.renditions_field.to_representation
+
+        if self.fields == LIST_FIELDS:
+            # The full list is the hot path, so it skips the generic loop
+            ingredients, tags = relations['ingredients'], relations['tags']
+            return [
+                {
+                    'id': row['id'],
+                    'title': row['title'],
+                    'ingredients': ingredients[row['id']],
+                    'tags': tags[row['id']],
+                    'time_minutes': row['time_minutes'],
+                    'price': to_price(row['price']),
+                    'link': row['link'],
+                }
+                for row in rows
+            ]
+
+        data = []
+        for row in rows:
+            item = {}
+            for name in self.fields:
+                if name in relations:
+                    item[name] = relations[name][row['id']]
+                elif name in converters:
+                    item[name] = converters[name](row[name])
+                else:
+                    item[name] = row[name]
+            data.append(item)
+
+        return data
+
+
+class RecipeReadMixin:
+    '''Serve recipe list and retrieve through RecipeReader
+
+    Both accept `fields` and `expand` as comma separated query
+    parameters.
+    '''
+
+    def _get_names(self, param, allowed):
+        '''Return the names listed in a query parameter, or None'''
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise exceptions.ValidationError({param: [
+                f'Unknown: {", ".join(unknown)}. '
+                f'Expected any of: {", ".join(allowed)}.'
+            ]})
+
+        return names
+
+    def get_reader(self, detail=False):
+        '''Return a reader for this request's fields and expansions'''
+        return RecipeReader(
+            self.get_serializer_context(),
+            detail=detail,
+            fields=self._get_names(
+                'fields', DETAIL_FIELDS if detail else LIST_FIELDS
+            ),
+            expand=self._get_names('expand', EXPANDABLE) or ()
+        )
+
+    def list(self, request, *args, **kwargs):
+        '''List recipes from .values() rows'''
+        reader = self.get_reader()
+        rows = reader.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(reader.represent(page))
+
+        return Response(reader.represent(rows))
+
+    def retrieve(self, request, *args, **kwargs):
+        '''Retrieve one recipe from a .values() row'''
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        reader = self.get_reader(detail=True)
+        queryset = self.filter_queryset(self.get_queryset())
+        # Same 404s as get_object(), without building the instance
+        try:
+            rows = list(reader.values(queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            ))[:1])
+        except (TypeError, ValueError, ValidationError):
+            rows = []
+        if not rows:
+            raise Http404('No Recipe matches the given query.')
+
+        return Response(reader.represent(rows)[0])
@@ -1,8 +1,89 @@
+from django.core.files.storage import default_storage
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 
 from core.models import Ingredient, Recipe, Tag
 
 
+class ManyUserPrimaryKeyRelatedField(serializers.ManyRelatedField):
+    '''List of primary keys resolved with a single query'''
+
+    def to_internal_value(self, data):
+        '''Resolve every primary key at once, reporting all missing'''
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        pks = []
+        for item in data:
+            try:
+                if isinstance(item, bool):
+                    raise TypeError
+                pks.append(int(item))
+            except (TypeError, ValueError):
+                self.child_relation.fail(
+                    'incorrect_type',
+                    data_type=type(item).__name__
+                )
+
+        objects = self.child_relation.get_queryset().in_bulk(pks)
+        missing = [pk for pk in dict.fromkeys(pks) if pk not in objects]
+        if missing:
+            message = self.child_relation.error_messages['does_not_exist']
+            raise serializers.ValidationError(
+                [message.format(pk_value=pk) for pk in missing],
+                code='does_not_exist'
+            )
+
+        return [objects[pk] for pk in dict.fromkeys(pks)]
+
+
+class RenditionsField(serializers.Field):
+    '''Read only map of image renditions to their URLs'''
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        '''Return {format: {width: url}} for the stored rendition paths'''
+        request = self.context.get('request')
+        renditions = {}
+        for extension, paths in value.items():
+            renditions[extension] = {}
+            for width, path in paths.items():
+                url = default_storage.url(path)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                renditions[extension][width] = url
+
+        return renditions
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    '''Primary key field limited to objects of the requesting user'''
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        '''Validate many=True lists with one query for the whole list'''
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+
+        return ManyUserPrimaryKeyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        '''Return only objects owned by the requesting user'''
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is not None:
+            queryset = queryset.filter(user=request.user)
+
+        return queryset
+
+
 class TagSerializer(serializers.ModelSerializer):
     '''Serializer for tag objects'''
 
@@ -23,11 +104,11 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 class RecipeSerializer(serializers.ModelSerializer):
     '''Serializer for recipe objects'''
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -43,12 +124,35 @@ class RecipeDetailSerializer(RecipeSerializer):
     '''Serialize a recipe detail'''
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
+    renditions = RenditionsField()
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('renditions',)
+
+
+class RecipeBulkSerializer(serializers.ModelSerializer):
+    '''Serializer for validating recipes in bulk writes'''
+    id = serializers.IntegerField(required=False)
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False
+    )
+
+    class Meta:
+        model = Recipe
+        fields = ('id', 'title', 'ingredients', 'tags', 'time_minutes',
+                  'price', 'link')
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     '''Serializer for uploading images to recipes'''
+    renditions = RenditionsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
+        fields = ('id', 'image', 'renditions')
         read_only_fields = ('id',)
@@ -0,0 +1,182 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save, \
+                                     pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.journal import record_changes
+from core.models import ChangeLog, Ingredient, Recipe, Tag
+from core.search import update_search_vectors
+from recipe.cache import bump_user_version
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_user_cache(sender, instance, **kwargs):
+    '''Invalidate cached responses for the owner of a changed object'''
+    bump_user_version(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_user_cache_m2m(sender, instance, action, **kwargs):
+    '''Invalidate cached responses when recipe relations change'''
+    if action.startswith('post_'):
+        bump_user_version(instance.user_id)
+
+
+@receiver(post_save, sender=get_user_model())
+def reset_new_user_cache(sender, instance, created, **kwargs):
+    '''Start new users on a fresh version so reused IDs never hit'''
+    if created:
+        bump_user_version(instance.id)
+
+
+def _touch_recipes(**filters):
+    '''Move updated_at on recipes whose rendered relations changed'''
+    Recipe.objects.filter(**filters).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_recipes_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    '''Keep recipe validators fresh when tags or ingredients change'''
+    if not reverse:
+        if action.startswith('post_'):
+            _touch_recipes(pk=instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        _touch_recipes(pk__in=pk_set)
+    elif action == 'pre_clear':
+        _touch_recipes(pk__in=instance.recipe_set.values('pk'))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def touch_recipes_tag(sender, instance, **kwargs):
+    '''Recipe details embed tag names, so renames must move updated_at'''
+    if not kwargs.get('created'):
+        _touch_recipes(tags=instance)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def touch_recipes_ingredient(sender, instance, **kwargs):
+    '''Recipe details embed ingredient names, so renames must move it'''
+    if not kwargs.get('created'):
+        _touch_recipes(ingredients=instance)
+
+
+def _update_search(**filters):
+    '''Rebuild the search vectors of the matching recipes'''
+    update_search_vectors(Recipe.objects.filter(**filters))
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search(sender, instance, update_fields, **kwargs):
+    '''Index new recipes and title changes'''
+    if update_fields is None or 'title' in update_fields:
+        _update_search(pk=instance.pk)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def collect_recipe_ids_clear(sender, instance, action, reverse, **kwargs):
+    '''Remember which recipes lose a tag or ingredient being cleared
+
+    The affected recipes are only known before the rows are gone.
+    '''
+    if reverse and action == 'pre_clear':
+        instance._recipe_ids = list(
+            instance.recipe_set.values_list('pk', flat=True)
+        )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_recipe_search_m2m(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    '''Reindex recipes whose tags or ingredients changed'''
+    if not reverse:
+        if action.startswith('post_'):
+            _update_search(pk=instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        _update_search(pk__in=pk_set)
+    elif action == 'post_clear':
+        _update_search(pk__in=instance._recipe_ids)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def update_recipe_search_name(sender, instance, created, **kwargs):
+    '''Reindex recipes using a renamed tag or ingredient'''
+    if not created:
+        _update_search(pk__in=instance.recipe_set.values('pk'))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def collect_recipe_ids_delete(sender, instance, **kwargs):
+    '''Remember which recipes lose a tag or ingredient being deleted'''
+    instance._recipe_ids = list(
+        instance.recipe_set.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def update_recipe_search_delete(sender, instance, **kwargs):
+    '''Reindex recipes that lost a deleted tag or ingredient'''
+    ids = getattr(instance, '_recipe_ids', None)
+    if ids:
+        _update_search(pk__in=ids)
+
+
+JOURNAL_KINDS = {
+    Recipe: ChangeLog.RECIPE,
+    Tag: ChangeLog.TAG,
+    Ingredient: ChangeLog.INGREDIENT,
+}
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def journal_change(sender, instance, **kwargs):
+    '''Journal saves, and deletes as tombstones, for delta sync'''
+    record_changes(
+        instance.user_id,
+        JOURNAL_KINDS[sender],
+        [instance.pk],
+        deleted=kwargs['signal'] is post_delete
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def journal_change_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    '''Journal recipes whose tag or ingredient IDs changed'''
+    if not reverse:
+        if action.startswith('post_'):
+            record_changes(instance.user_id, ChangeLog.RECIPE, [instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        record_changes(instance.user_id, ChangeLog.RECIPE, pk_set)
+    elif action == 'post_clear':
+        record_changes(
+            instance.user_id, ChangeLog.RECIPE, instance._recipe_ids
+        )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def journal_change_delete(sender, instance, **kwargs):
+    '''Journal recipes that lost a deleted tag or ingredient'''
+    ids = getattr(instance, '_recipe_ids', None)
+    if ids:
+        record_changes(instance.user_id, ChangeLog.RECIPE, ids)
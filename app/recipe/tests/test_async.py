@@ -0,0 +1,140 @@
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.metrics import registry
+from core.models import Ingredient, Recipe, Tag
+from recipe import async_views
+from recipe.factories import create_recipe
+
+
+ASYNC_TAGS_URL = reverse('recipe:async-tag-list')
+ASYNC_INGREDIENTS_URL = reverse('recipe:async-ingredient-list')
+ASYNC_RECIPES_URL = reverse('recipe:async-recipe-list')
+
+
+def async_detail_url(recipe_id):
+    '''Return the async recipe detail URL'''
+    return reverse('recipe:async-recipe-detail', args=[recipe_id])
+
+
+class PublicAsyncApiTests(TransactionTestCase):
+    '''Test unauthenticated access to the async endpoints'''
+
+    def test_authentication_required(self):
+        '''Test: the async endpoints require authentication'''
+        client = APIClient()
+
+        for url in (ASYNC_TAGS_URL, ASYNC_INGREDIENTS_URL,
+                    ASYNC_RECIPES_URL, async_detail_url(1)):
+            res = client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateAsyncApiTests(TransactionTestCase):
+    '''Test the async read endpoints
+
+    The views run on the database thread pool, which uses its own
+    connections, so the test data has to be committed.
+    '''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'example@example.com',
+            'django123!'
+        )
+        self.other_user = get_user_model().objects.create_user(
+            'other-user@example.com',
+            'django321!'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_matches_sync_endpoint(self):
+        '''Test: the async recipe list returns the same recipes'''
+        recipe = create_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        create_recipe(self.other_user)
+
+        res = self.client.get(ASYNC_RECIPES_URL)
+        sync = self.client.get(reverse('recipe:recipe-list'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['results'], sync.json()['results'])
+        self.assertEqual(len(res.json()['results']), 1)
+
+    def test_attribute_lists_scoped_to_user(self):
+        '''Test: async tag and ingredient lists only show own objects'''
+        Tag.objects.create(user=self.user, name='Mine')
+        Tag.objects.create(user=self.other_user, name='Theirs')
+        Ingredient.objects.create(user=self.user, name='Salt')
+        Ingredient.objects.create(user=self.other_user, name='Pepper')
+
+        tags = self.client.get(ASYNC_TAGS_URL, {'assigned_only': 0})
+        ingredients = self.client.get(ASYNC_INGREDIENTS_URL)
+
+        self.assertEqual(
+            [tag['name'] for tag in tags.json()['results']], ['Mine']
+        )
+        self.assertEqual(
+            [item['name'] for item in ingredients.json()['results']],
+            ['Salt']
+        )
+
+    def test_retrieve_recipe(self):
+        '''Test: retrieving a recipe, but not another user's'''
+        recipe = create_recipe(self.user, title='Mine')
+        other = create_recipe(self.other_user, title='Theirs')
+
+        res = self.client.get(async_detail_url(recipe.id))
+        missing = self.client.get(async_detail_url(other.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['title'], 'Mine')
+        self.assertIn('ETag', res)
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_read_only(self):
+        '''Test: the async endpoints do not accept writes'''
+        res = self.client.post(
+            ASYNC_RECIPES_URL,
+            {'title': 'New', 'time_minutes': 5, 'price': '1.00'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_runs_on_database_pool(self):
+        '''Test: the view runs on the database thread pool'''
+        threads = []
+        call_view = async_views._call_view
+
+        def record_thread(*args):
+            threads.append(threading.current_thread().name)
+            return call_view(*args)
+
+        with patch('recipe.async_views._call_view', record_thread):
+            self.client.get(ASYNC_TAGS_URL)
+
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith('db_'))
+
+    def test_pool_queries_recorded(self):
+        '''Test: queries run on the pool count towards the request'''
+        create_recipe(self.user)
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+        self.client.get(ASYNC_RECIPES_URL)
+
+        self.assertRegex(
+            registry.render(),
+            r'api_db_queries_sum\{view="recipe:async-recipe-list",'
+            r'method="GET"\} [1-9]'
+        )
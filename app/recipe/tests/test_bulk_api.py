@@ -0,0 +1,247 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ChangeLog, ImageJob, Ingredient, Recipe, Tag
+from recipe.factories import create_recipe, create_recipes
+
+
+BULK_URL = reverse('recipe:recipe-bulk')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class BulkRecipeApiTests(TestCase):
+    '''Test the bulk recipe endpoint'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'example@example.com',
+            'django123!'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user,
+            name='Kale'
+        )
+
+    def test_bulk_create_recipes(self):
+        '''Test: creating many recipes with relations in one request'''
+        payload = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10 + i,
+                'price': '4.50',
+                'tags': [self.tag.id],
+                'ingredients': [self.ingredient.id],
+            }
+            for i in range(3)
+        ]
+        payload.append({'title': 'Plain', 'time_minutes': 5, 'price': '1.00'})
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 4)
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 4)
+        self.assertEqual(recipes.filter(tags=self.tag).count(), 3)
+        self.assertEqual(
+            recipes.filter(ingredients=self.ingredient).count(), 3
+        )
+        self.assertEqual(res.data[0]['tags'], [self.tag.id])
+
+    def test_bulk_create_validates_ids_once(self):
+        '''Test: referenced IDs are checked with one query per model'''
+        payload = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10,
+                'price': '4.50',
+                'tags': [self.tag.id],
+                'ingredients': [self.ingredient.id],
+            }
+            for i in range(20)
+        ]
+
+        with self.assertNumQueries(2):
+            res = self.client.post(
+                BULK_URL,
+                payload + [dict(payload[0], tags=[999])],
+                format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_reports_item_errors(self):
+        '''Test: invalid items are reported per item and nothing is saved'''
+        other_user = get_user_model().objects.create_user(
+            'other-user@example.com',
+            'django321!'
+        )
+        other_tag = Tag.objects.create(user=other_user, name='Meat')
+        payload = [
+            {'title': 'Valid', 'time_minutes': 5, 'price': '1.00'},
+            {'title': '', 'time_minutes': 5, 'price': '1.00'},
+            {
+                'title': 'Foreign tag',
+                'time_minutes': 5,
+                'price': '1.00',
+                'tags': [other_tag.id, 999, 999],
+            },
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('title', res.data[1])
+        self.assertEqual(len(res.data[2]['tags']), 2)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_requires_list(self):
+        '''Test: the bulk endpoint rejects a non-list payload'''
+        res = self.client.post(
+            BULK_URL,
+            {'title': 'One', 'time_minutes': 5, 'price': '1.00'},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_invalidates_list_cache(self):
+        '''Test: bulk created recipes show up in the recipe list'''
+        self.client.get(RECIPES_URL)
+        payload = [{'title': 'New', 'time_minutes': 5, 'price': '1.00'}]
+
+        self.client.post(BULK_URL, payload, format='json')
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_bulk_update_recipes(self):
+        '''Test: partially updating many recipes in one request'''
+        recipe1 = create_recipe(self.user, title='One')
+        recipe2 = create_recipe(self.user, title='Two')
+        recipe2.tags.add(self.tag)
+        payload = [
+            {'id': recipe1.id, 'price': '9.99', 'tags': [self.tag.id]},
+            {'id': recipe2.id, 'title': 'Second', 'tags': []},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe1.refresh_from_db()
+        recipe2.refresh_from_db()
+        self.assertEqual(recipe1.price, Decimal('9.99'))
+        self.assertEqual(recipe1.title, 'One')
+        self.assertEqual(list(recipe1.tags.all()), [self.tag])
+        self.assertEqual(recipe2.title, 'Second')
+        self.assertFalse(recipe2.tags.exists())
+
+    def test_bulk_update_other_users_recipe(self):
+        '''Test: recipes of other users cannot be bulk updated'''
+        other_user = get_user_model().objects.create_user(
+            'other-user@example.com',
+            'django321!'
+        )
+        recipe = create_recipe(other_user, title='Theirs')
+
+        res = self.client.patch(
+            BULK_URL,
+            [{'id': recipe.id, 'title': 'Mine'}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data[0])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Theirs')
+
+    def test_bulk_update_duplicate_recipe(self):
+        '''Test: a recipe listed twice is reported, not a server error'''
+        recipe = create_recipe(self.user, title='One')
+        payload = [
+            {'id': recipe.id, 'tags': [self.tag.id]},
+            {'id': recipe.id, 'title': 'Two', 'tags': [self.tag.id]},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('id', res.data[1])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'One')
+        self.assertFalse(recipe.tags.exists())
+
+    def test_bulk_delete_recipes(self):
+        '''Test: deleting many recipes in one request'''
+        recipe1 = create_recipe(self.user)
+        recipe2 = create_recipe(self.user)
+        recipe3 = create_recipe(self.user)
+
+        res = self.client.delete(
+            BULK_URL,
+            [recipe1.id, recipe2.id],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            list(Recipe.objects.values_list('id', flat=True)),
+            [recipe3.id]
+        )
+
+    def test_bulk_delete_batched(self):
+        '''Test: deleting more recipes runs no more queries'''
+        def count_queries(n):
+            recipes = create_recipes(self.user, n, tags=[self.tag])
+            ImageJob.objects.create(recipe=recipes[0], source='a.jpg')
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.delete(
+                    BULK_URL, [recipe.id for recipe in recipes],
+                    format='json'
+                )
+            self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+            return len(queries)
+
+        self.assertEqual(count_queries(2), count_queries(20))
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(Recipe.tags.through.objects.exists())
+        self.assertEqual(
+            ChangeLog.objects.filter(
+                kind=ChangeLog.RECIPE, deleted=True
+            ).count(),
+            22
+        )
+
+    def test_bulk_delete_invalidates_list_cache(self):
+        '''Test: bulk deleted recipes leave the recipe list'''
+        recipe = create_recipe(self.user)
+        self.client.get(RECIPES_URL)
+
+        self.client.delete(BULK_URL, [recipe.id], format='json')
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_bulk_delete_unknown_id(self):
+        '''Test: an unknown ID aborts the whole bulk delete'''
+        recipe = create_recipe(self.user)
+
+        res = self.client.delete(BULK_URL, [recipe.id, 999], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('id', res.data[1])
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
@@ -0,0 +1,189 @@
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.cache import CACHE_ALIAS, get_user_version
+from recipe.factories import create_recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class ResponseCacheTests(TestCase):
+    '''Test the per-user response cache for list endpoints'''
+
+    def setUp(self):
+        caches[CACHE_ALIAS].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'example@example.com',
+            'django123!'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        '''Test: a repeated list request issues no queries'''
+        create_recipe(self.user)
+        res1 = self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(0):
+            res2 = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res2.status_code, status.HTTP_200_OK)
+        self.assertEqual(res1.data, res2.data)
+
+    def test_query_params_normalized(self):
+        '''Test: query parameter order does not change the cache entry'''
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Kale')
+        self.client.get(
+            RECIPES_URL + f'?tags={tag.id}&ingredients={ingredient.id}'
+        )
+
+        with self.assertNumQueries(0):
+            self.client.get(
+                RECIPES_URL + f'?ingredients={ingredient.id}&tags={tag.id}'
+            )
+
+    def test_recipe_changes_invalidate(self):
+        '''Test: creating, updating and deleting recipes invalidates'''
+        recipe = create_recipe(self.user, title='Old title')
+        self.client.get(RECIPES_URL)
+
+        recipe.title = 'New title'
+        recipe.save()
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.data['results'][0]['title'], 'New title')
+
+        create_recipe(self.user)
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data['results']), 2)
+
+        recipe.delete()
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_relation_changes_invalidate(self):
+        '''Test: adding tags to a recipe invalidates the cached list'''
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(RECIPES_URL)
+
+        recipe.tags.add(tag)
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'][0]['tags'], [tag.id])
+
+    def test_tag_changes_invalidate(self):
+        '''Test: creating a tag through the API invalidates the tag list'''
+        self.client.get(TAGS_URL)
+
+        self.client.post(TAGS_URL, {'name': 'Breakfast'})
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_cache_isolated_per_user(self):
+        '''Test: users never see each others cached responses'''
+        other_user = get_user_model().objects.create_user(
+            'other-user@example.com',
+            'django321!'
+        )
+        Ingredient.objects.create(user=self.user, name='Salt')
+        self.client.get(INGREDIENTS_URL)
+
+        self.client.force_authenticate(other_user)
+        res = self.client.get(INGREDIENTS_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_other_user_changes_keep_cache(self):
+        '''Test: writes by another user leave the cache version alone'''
+        other_user = get_user_model().objects.create_user(
+            'other-user@example.com',
+            'django321!'
+        )
+        version = get_user_version(self.user.id)
+
+        create_recipe(other_user)
+
+        self.assertEqual(get_user_version(self.user.id), version)
+
+    def test_evicted_version_does_not_resurrect(self):
+        '''Test: losing the version key never serves stale entries'''
+        create_recipe(self.user, title='Stale')
+        self.client.get(RECIPES_URL)
+        Recipe.objects.filter(user=self.user).update(title='Fresh')
+        caches[CACHE_ALIAS].delete(f'recipe:version:{self.user.id}')
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'][0]['title'], 'Fresh')
+
+
+class SharedCacheTests(TestCase):
+    '''Test invalidation between processes sharing the api cache'''
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        # Two backend instances on one store stand in for two processes
+        self.processes = [FileBasedCache(location, {}) for i in range(2)]
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'example@example.com',
+            'django123!'
+        )
+        self.client.force_authenticate(self.user)
+
+    def in_process(self, index):
+        '''Route the api cache to the given process's backend'''
+        return patch(
+            'recipe.cache.caches', {CACHE_ALIAS: self.processes[index]}
+        )
+
+    def test_write_invalidates_other_process(self):
+        '''Test: a write in one process is not served stale by another'''
+        recipe = create_recipe(self.user, title='Old title')
+        with self.in_process(0):
+            self.client.get(RECIPES_URL)
+            with self.assertNumQueries(0):
+                self.client.get(RECIPES_URL)
+
+        with self.in_process(1):
+            self.client.patch(
+                reverse('recipe:recipe-detail', args=[recipe.id]),
+                {'title': 'New title'}
+            )
+        with self.in_process(0):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'][0]['title'], 'New title')
+
+
+class CommitInvalidationTests(TransactionTestCase):
+    '''Test cache invalidation around transactions'''
+
+    def test_bumped_again_on_commit(self):
+        '''Test: a write bumps the version again once it commits'''
+        user = get_user_model().objects.create_user('example@example.com')
+
+        with transaction.atomic():
+            create_recipe(user)
+            # A concurrent request could cache the old rows under this
+            during = get_user_version(user.id)
+
+        self.assertNotEqual(get_user_version(user.id), during)
@@ -0,0 +1,128 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag
+from recipe.cache import CACHE_ALIAS
+from recipe.factories import create_recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    '''Return recipe detail URL'''
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ConditionalGetTests(TestCase):
+    '''Test ETag and Last-Modified handling on recipe endpoints'''
+
+    def setUp(self):
+        caches[CACHE_ALIAS].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'example@example.com',
+            'django123!'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(self.user)
+
+    def test_detail_sends_validators(self):
+        '''Test: recipe detail has an ETag and Last-Modified header'''
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', res)
+
+    def test_detail_not_modified(self):
+        '''Test: a matching If-None-Match returns 304 with one query'''
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertFalse(res.content)
+
+    def test_detail_modified_after_update(self):
+        '''Test: updating a recipe changes its ETag'''
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        self.client.patch(url, {'title': 'Changed'})
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_detail_modified_after_tag_rename(self):
+        '''Test: renaming a tag shown in the detail changes its ETag'''
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.recipe.tags.add(tag)
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        tag.name = 'Vegetarian'
+        tag.save()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_detail_missing_returns_404(self):
+        '''Test: validators are not computed for recipes of other users'''
+        other_user = get_user_model().objects.create_user(
+            'other-user@example.com',
+            'django321!'
+        )
+        recipe = create_recipe(other_user)
+
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', res)
+
+    def test_list_not_modified(self):
+        '''Test: an unchanged recipe list returns 304'''
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_not_modified_without_cache(self):
+        '''Test: 304 is decided before serialization on a cache miss'''
+        etag = self.client.get(RECIPES_URL)['ETag']
+        caches[CACHE_ALIAS].clear()
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_modified_after_delete(self):
+        '''Test: deleting a recipe changes the list ETag'''
+        create_recipe(self.user)
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        self.client.delete(detail_url(self.recipe.id))
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_list_etag_depends_on_filters(self):
+        '''Test: filtered lists carry their own ETag'''
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        res1 = self.client.get(RECIPES_URL)
+        res2 = self.client.get(RECIPES_URL, {'tags': tag.id})
+
+        self.assertNotEqual(res1['ETag'], res2['ETag'])
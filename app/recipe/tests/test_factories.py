@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core.models import ChangeLog, Recipe, Tag
+from core.search import search_recipes
+from recipe.cache import get_user_version
+from recipe.factories import create_ingredients, create_recipes, \
+                             create_tags, create_users
+
+
+class FactoryTests(TestCase):
+    '''Test the bulk fixture factories'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'example@example.com',
+            'django123!'
+        )
+
+    def test_create_users(self):
+        '''Test: users share one password hash and get their IDs'''
+        # savepoint, insert, read back IDs, release
+        with self.assertNumQueries(4):
+            users = create_users(3, password='django123!')
+
+        self.assertEqual(len({user.email for user in users}), 3)
+        for user in users:
+            stored = get_user_model().objects.get(pk=user.pk)
+            self.assertEqual(stored.email, user.email)
+            self.assertTrue(check_password('django123!', stored.password))
+        self.assertFalse(create_users(1)[0].has_usable_password())
+
+    def test_create_tags_and_ingredients(self):
+        '''Test: names may be given or counted'''
+        tags = create_tags(self.user, ['Vegan', 'Quick'])
+        ingredients = create_ingredients(self.user, 3)
+
+        self.assertEqual(
+            list(Tag.objects.filter(user=self.user).values_list(
+                'pk', 'name'
+            ).order_by('pk')),
+            [(tag.pk, tag.name) for tag in tags]
+        )
+        self.assertEqual(
+            [item.name for item in ingredients],
+            ['Ingredient 0', 'Ingredient 1', 'Ingredient 2']
+        )
+
+    def test_create_recipes_constant_queries(self):
+        '''Test: recipes and their links cost a fixed number of queries'''
+        tags = create_tags(self.user, 5)
+        ingredients = create_ingredients(self.user, 5)
+        counts = []
+        for n in (1, 50):
+            with CaptureQueriesContext(connection) as ctx:
+                create_recipes(
+                    self.user, n, tags=tags,
+                    ingredients=lambda i: ingredients[:i % 5 + 1]
+                )
+            counts.append(len(ctx))
+
+        self.assertEqual(counts[0], counts[1])
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('pk')
+        self.assertEqual(recipes.count(), 51)
+        self.assertEqual(recipes[1].title, 'Recipe 0')
+        self.assertEqual(recipes[3].ingredients.count(), 3)
+        self.assertEqual(recipes[3].tags.count(), 5)
+
+    def test_create_recipes_like_the_api(self):
+        '''Test: created recipes are searchable, synced and uncached'''
+        tag, = create_tags(self.user, ['Vegan'])
+        version = get_user_version(self.user.pk)
+
+        recipe, = create_recipes(
+            self.user, 1, tags=[tag.pk], title=lambda i: 'Lentil Soup'
+        )
+
+        self.assertEqual(
+            list(search_recipes(Recipe.objects.all(), 'vegan soup')),
+            [recipe]
+        )
+        self.assertTrue(ChangeLog.objects.filter(
+            kind=ChangeLog.RECIPE, object_id=recipe.pk
+        ).exists())
+        self.assertNotEqual(get_user_version(self.user.pk), version)
@@ -0,0 +1,142 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag
+from recipe.factories import create_ingredients, create_recipe, \
+    create_recipes
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class PaginationApiTests(TestCase):
+    '''Test keyset pagination on the recipe API list endpoints'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'example@example.com',
+            'django123!'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_recipes_paginated_newest_first(self):
+        '''Test: recipes are returned in pages, newest first'''
+        recipes = create_recipes(self.user, 5)
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data['previous'])
+        self.assertIsNotNone(res.data['next'])
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']],
+            [recipes[4].id, recipes[3].id]
+        )
+
+    def test_recipes_follow_cursor_to_last_page(self):
+        '''Test: following the next cursor walks every recipe once'''
+        recipes = create_recipes(self.user, 5)
+
+        seen = []
+        url = RECIPES_URL + '?page_size=2'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            seen.extend(recipe['id'] for recipe in res.data['results'])
+            url = res.data['next']
+
+        self.assertEqual(seen, [recipe.id for recipe in reversed(recipes)])
+
+    def test_recipes_new_rows_do_not_shift_pages(self):
+        '''Test: recipes created while scrolling do not repeat items'''
+        create_recipes(self.user, 4)
+
+        res1 = self.client.get(RECIPES_URL, {'page_size': 2})
+        create_recipe(self.user, title='Latecomer')
+        res2 = self.client.get(res1.data['next'])
+
+        first_ids = {recipe['id'] for recipe in res1.data['results']}
+        second_ids = {recipe['id'] for recipe in res2.data['results']}
+
+        self.assertEqual(len(second_ids), 2)
+        self.assertFalse(first_ids & second_ids)
+
+    @override_settings(API_MAX_PAGE_SIZE=3)
+    def test_page_size_capped(self):
+        '''Test: requested page size is capped at the maximum'''
+        create_recipes(self.user, 5)
+
+        res = self.client.get(RECIPES_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 3)
+
+    def test_tags_paginated_by_name_then_id(self):
+        '''Test: tags sharing a name are paged without gaps or repeats'''
+        tags = [Tag.objects.create(user=self.user, name='Dinner')
+                for i in range(3)]
+        zesty = Tag.objects.create(user=self.user, name='Zesty')
+
+        seen = []
+        url = TAGS_URL + '?page_size=2'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            seen.extend(tag['id'] for tag in res.data['results'])
+            url = res.data['next']
+
+        self.assertEqual(seen, [zesty.id] + [tag.id for tag in tags])
+
+    def walk(self, url, link='next'):
+        '''Follow the link from url and return every result'''
+        seen = []
+        for page in range(100):
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            seen.extend(item['id'] for item in res.data['results'])
+            url = res.data[link]
+            if not url:
+                return seen
+
+        self.fail('The cursor never ran out')
+
+    @override_settings(API_MAX_PAGE_SIZE=500)
+    def test_ranked_ties_paged_past_offset_cutoff(self):
+        '''Test: more tied ranks than DRF's offset cutoff page cleanly'''
+        salt, = create_ingredients(self.user, ['Salt'])
+        recipes = create_recipes(self.user, 1600, ingredients=[salt])
+
+        seen = self.walk(
+            RECIPES_URL + f'?ingredients={salt.id}'
+            '&ordering=-matched_ingredients&page_size=500'
+        )
+
+        self.assertEqual(seen, [recipe.id for recipe in reversed(recipes)])
+
+    def test_previous_cursor_walks_back(self):
+        '''Test: previous links return the earlier pages in order'''
+        recipes = create_recipes(self.user, 5)
+        url = RECIPES_URL + '?page_size=2'
+        while True:
+            res = self.client.get(url)
+            if not res.data['next']:
+                break
+            url = res.data['next']
+
+        seen = self.walk(res.data['previous'], link='previous')
+
+        self.assertEqual(seen, [
+            recipes[2].id, recipes[1].id, recipes[4].id, recipes[3].id
+        ])
+
+    def test_invalid_cursor(self):
+        '''Test: a tampered cursor is rejected'''
+        for cursor in ('cD1bMSwyXQ==', 'cD1ub3Q='):
+            res = self.client.get(RECIPES_URL, {'cursor': cursor})
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.factories import create_ingredients, create_recipes, \
+                             create_tags
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    '''Return recipe detail URL'''
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class QueryCountMixin:
+    '''Assertions on the number of SQL queries an endpoint issues'''
+
+    def assertConstantQueries(self, url, add_rows, expected,
+                              sizes=(1, 10)):
+        '''Assert GET url costs `expected` queries for every row count
+
+        `add_rows(n)` is called before each request to grow the data set
+        to `n` rows, so a query count that depends on the number of rows
+        (an N+1) fails the assertion.
+        '''
+        for size in sizes:
+            add_rows(size)
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.get(url)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(
+                len(ctx.captured_queries), expected,
+                f'{len(ctx.captured_queries)} queries for {size} rows: '
+                + '\n'.join(q['sql'] for q in ctx.captured_queries)
+            )
+
+
+class RecipeQueryCountTests(QueryCountMixin, TestCase):
+    '''Test the recipe endpoints issue a fixed number of queries'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'example@example.com',
+            'django123!'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _create_recipe(self, n_relations=2):
+        '''Create a recipe with the given number of tags and ingredients'''
+        recipe, = create_recipes(
+            self.user, 1,
+            tags=create_tags(self.user, n_relations),
+            ingredients=create_ingredients(self.user, n_relations)
+        )
+
+        return recipe
+
+    def test_list_recipes_constant_queries(self):
+        '''Test: listing recipes does not issue a query per recipe'''
+        def add_rows(n):
+            while Recipe.objects.filter(user=self.user).count() < n:
+                self._create_recipe()
+
+        # validators, page, ingredient links, tag links
+        self.assertConstantQueries(RECIPES_URL, add_rows, 4)
+
+    def test_retrieve_recipe_constant_queries(self):
+        '''Test: retrieving a recipe does not issue a query per relation'''
+        recipe = self._create_recipe(n_relations=0)
+
+        def add_rows(n):
+            while recipe.tags.count() < n:
+                recipe.tags.add(
+                    Tag.objects.create(user=self.user, name='Tag')
+                )
+                recipe.ingredients.add(
+                    Ingredient.objects.create(user=self.user, name='Salt')
+                )
+
+        # validators, recipe, ingredient links, tag links
+        self.assertConstantQueries(detail_url(recipe.id), add_rows, 4)
+
+    def test_tag_list_without_distinct(self):
+        '''Test: tag lists use EXISTS rather than a JOIN with DISTINCT'''
+        self._create_recipe()
+
+        for params in ({}, {'assigned_only': 1}):
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.get(TAGS_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            sql = ctx.captured_queries[-1]['sql']
+            self.assertNotIn('DISTINCT', sql)
+            self.assertEqual('EXISTS' in sql, bool(params))
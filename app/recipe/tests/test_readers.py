@@ -0,0 +1,211 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Prefetch
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.readers import RecipeReader
+from recipe.serializers import RecipeDetailSerializer, RecipeSerializer
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    '''Return recipe detail URL'''
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def prefetched(queryset):
+    '''Prefetch the relations in the id order RecipeReader uses'''
+    return queryset.prefetch_related(
+        Prefetch('ingredients', Ingredient.objects.order_by('id')),
+        Prefetch('tags', Tag.objects.order_by('id')),
+    )
+
+
+class RecipeReaderParityTests(TestCase):
+    '''Test RecipeReader renders exactly what the serializers render'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'example@example.com',
+            'django123!'
+        )
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Dessert', 'Quick', 'Crème')
+        ]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Salt', 'Flour', '“Sugar”', 'Eggs', 'Milk')
+        ]
+        prices = (Decimal('0.5'), Decimal('999.99'), 10, Decimal('7.25'))
+        for i, price in enumerate(prices):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}  ',
+                time_minutes=i * 7,
+                price=price,
+                link=f'https://example.com/{i}' if i % 2 else '',
+                renditions={'jpeg': {'320': f'uploads/r{i}/320w.jpeg'}}
+                if i % 2 else {}
+            )
+            recipe.tags.add(*tags[i:])
+            recipe.ingredients.add(*reversed(ingredients[:i + 1]))
+        Recipe.objects.create(
+            user=self.user, title='Bare', time_minutes=1, price=1
+        )
+        self.queryset = Recipe.objects.filter(user=self.user).order_by('-id')
+        self.context = {'request': RequestFactory().get('/')}
+
+    def assertSameJSON(self, expected, actual):
+        '''Assert both render to the same bytes, key order included'''
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(actual), renderer.render(expected))
+
+    def test_list_parity(self):
+        '''Test: list rows match RecipeSerializer'''
+        expected = RecipeSerializer(
+            prefetched(self.queryset), many=True, context=self.context
+        ).data
+
+        reader = RecipeReader(self.context)
+        actual = reader.represent(reader.values(self.queryset))
+
+        self.assertSameJSON(expected, actual)
+
+    def test_detail_parity(self):
+        '''Test: detail rows match RecipeDetailSerializer'''
+        expected = RecipeDetailSerializer(
+            prefetched(self.queryset), many=True, context=self.context
+        ).data
+
+        reader = RecipeReader(self.context, detail=True)
+        actual = reader.represent(reader.values(self.queryset))
+
+        self.assertSameJSON(expected, actual)
+
+    def test_api_parity(self):
+        '''Test: list and detail responses match the serializers'''
+        client = APIClient()
+        client.force_authenticate(self.user)
+        recipe = self.queryset.exclude(renditions={}).first()
+
+        res = client.get(RECIPES_URL)
+        detail = client.get(detail_url(recipe.id))
+
+        self.assertSameJSON(
+            RecipeSerializer(prefetched(self.queryset), many=True).data,
+            res.data['results']
+        )
+        self.assertSameJSON(
+            RecipeDetailSerializer(
+                prefetched(Recipe.objects).get(id=recipe.id),
+                context=self.context
+            ).data,
+            detail.data
+        )
+
+    def test_retrieve_malformed_id(self):
+        '''Test: a malformed recipe ID is a 404 like a missing one'''
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.get(detail_url('abc'))
+
+        self.assertEqual(res.status_code, 404)
+
+
+class SparseFieldsetTests(TestCase):
+    '''Test the fields and expand query parameters'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'example@example.com',
+            'django123!'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Salt'
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10, price=5
+        )
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+
+    def test_fields_narrow_output(self):
+        '''Test: only the requested fields, in serializer order'''
+        res = self.client.get(RECIPES_URL, {'fields': 'title,id'})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            list(res.data['results'][0].items()),
+            [('id', self.recipe.id), ('title', 'Soup')]
+        )
+
+    def test_fields_narrow_sql(self):
+        '''Test: unrequested columns and relations are not queried'''
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        sql = ' '.join(query['sql'] for query in queries).lower()
+        self.assertNotIn('"link"', sql)
+        self.assertNotIn('"price"', sql)
+        self.assertNotIn('recipe_tags', sql)
+        self.assertNotIn('recipe_ingredients', sql)
+
+    def test_fields_without_id(self):
+        '''Test: relations can be requested without the id'''
+        res = self.client.get(RECIPES_URL, {'fields': 'tags'})
+
+        self.assertEqual(res.data['results'], [{'tags': [self.tag.id]}])
+
+    def test_expand_on_list(self):
+        '''Test: expanded relations are nested like the detail'''
+        res = self.client.get(
+            RECIPES_URL, {'expand': 'tags', 'fields': 'tags,ingredients'}
+        )
+
+        self.assertEqual(res.data['results'], [{
+            'ingredients': [self.ingredient.id],
+            'tags': [{'id': self.tag.id, 'name': 'Vegan'}],
+        }])
+
+    def test_expand_matches_detail(self):
+        '''Test: a fully expanded list row matches the detail fields'''
+        res = self.client.get(
+            RECIPES_URL, {'expand': 'tags,ingredients'}
+        )
+        detail = self.client.get(detail_url(self.recipe.id))
+
+        row = res.json()['results'][0]
+        self.assertEqual(row['tags'], detail.json()['tags'])
+        self.assertEqual(row['ingredients'], detail.json()['ingredients'])
+
+    def test_fields_on_detail(self):
+        '''Test: the detail endpoint accepts fields too'''
+        res = self.client.get(
+            detail_url(self.recipe.id), {'fields': 'renditions,title'}
+        )
+
+        self.assertEqual(res.data, {'title': 'Soup', 'renditions': {}})
+
+    def test_unknown_names_rejected(self):
+        '''Test: unknown fields or expansions are a bad request'''
+        for params in ({'fields': 'id,secret'}, {'expand': 'user'},
+                       {'fields': 'renditions'}):
+            res = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(res.status_code, 400)
+            self.assertIn(list(params)[0], res.data)
@@ -5,13 +5,16 @@ from PIL import Image
 from decimal import Decimal
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Ingredient, Recipe, Tag
+from core.models import ImageJob, Ingredient, Recipe, Tag
+from recipe.factories import create_ingredients
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 
@@ -85,7 +88,7 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         '''Test: recipes returned are for the authenticated user'''
@@ -102,8 +105,8 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_recipe_detail(self):
         '''Test: view a recipe detail'''
@@ -216,6 +219,71 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(recipe.price, payload['price'])
         self.assertEqual(recipe.id, old_id)
 
+    def test_filter_recipes_matching_many_tags_unique(self):
+        '''Test: a recipe matching several filter tags is listed once'''
+        recipe = sample_recipe(user=self.user)
+        tag1 = sample_tag(user=self.user, name='Quick')
+        tag2 = sample_tag(user=self.user, name='Cheap')
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_create_recipe_other_users_tag_fails(self):
+        '''Test: tags of another user cannot be assigned to a recipe'''
+        other_user = get_user_model().objects.create_user(
+            'other-user@example.com',
+            'django321!'
+        )
+        tag = sample_tag(user=other_user)
+        payload = {
+            'title': 'Borrowed Tag',
+            'tags': [tag.id],
+            'time_minutes': 10,
+            'price': 2.00
+        }
+        res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_create_recipe_reports_all_missing_ids(self):
+        '''Test: every unknown ingredient ID is reported at once'''
+        ingredient = sample_ingredient(user=self.user)
+        payload = {
+            'title': 'Mystery Stew',
+            'ingredients': [ingredient.id, 998, 999, 999],
+            'time_minutes': 10,
+            'price': 2.00
+        }
+        res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        # Repeated unknown IDs are reported once
+        self.assertEqual(len(res.data['ingredients']), 2)
+        self.assertIn('998', res.data['ingredients'][0])
+        self.assertIn('999', res.data['ingredients'][1])
+
+    def test_create_recipe_validation_queries_constant(self):
+        '''Test: validating many ingredients costs the same as one'''
+        counts = []
+        for n in (1, 30):
+            ingredients = create_ingredients(self.user, n)
+            payload = {
+                'title': 'Big Salad',
+                'ingredients': [ingredient.id for ingredient in ingredients],
+                'time_minutes': 10,
+                'price': 2.00
+            }
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(RECIPES_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+
 
 class RecipeImageUploadTests(TestCase):
 
@@ -241,10 +309,38 @@ class RecipeImageUploadTests(TestCase):
             res = self.client.post(url, {'image': ntf}, format='multipart')
 
         self.recipe.refresh_from_db()
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    def test_upload_image_queues_renditions(self):
+        '''Test: uploading an image queues a rendition job'''
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            img = Image.new('RGB', (10, 10))
+            img.save(ntf, format='JPEG')
+            ntf.seek(0)
+            res = self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.recipe.refresh_from_db()
+        job = ImageJob.objects.get(recipe=self.recipe)
+        self.assertEqual(job.source, self.recipe.image.name)
+        self.assertEqual(res.data['renditions'], {})
+
+    def test_recipe_detail_exposes_renditions(self):
+        '''Test: rendition URLs are listed on the recipe detail'''
+        self.recipe.renditions = {
+            'webp': {'320': 'uploads/recipe/renditions/a/320w.webp'}
+        }
+        self.recipe.save()
+
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(
+            res.data['renditions']['webp']['320'],
+            'http://testserver/media/uploads/recipe/renditions/a/320w.webp'
+        )
+
     def test_upload_image_bad_request(self):
         '''Test: uploading an invalid image'''
         url = image_upload_url(self.recipe.id)
@@ -272,9 +368,9 @@ class RecipeImageUploadTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         '''Test: return recipes with specific ingredients'''
@@ -296,6 +392,84 @@ class RecipeImageUploadTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+    def test_filter_recipes_by_all_tags(self):
+        '''Test: tags_mode=all returns recipes with every given tag'''
+        recipe1 = sample_recipe(user=self.user, title='Vegan Curry')
+        recipe2 = sample_recipe(user=self.user, title='Beef Curry')
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Spicy')
+        recipe1.tags.add(tag1, tag2)
+        recipe2.tags.add(tag2)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'tags': f'{tag1.id},{tag2.id},{tag1.id}', 'tags_mode': 'all'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']],
+            [recipe1.id]
+        )
+
+    def test_filter_recipes_by_all_ingredients(self):
+        '''Test: ingredients_mode=all returns complete matches only'''
+        recipe1 = sample_recipe(user=self.user, title='Pancakes')
+        recipe2 = sample_recipe(user=self.user, title='Omelette')
+        eggs = sample_ingredient(user=self.user, name='Eggs')
+        flour = sample_ingredient(user=self.user, name='Flour')
+        recipe1.ingredients.add(eggs, flour)
+        recipe2.ingredients.add(eggs)
+
+        res = self.client.get(RECIPES_URL, {
+            'ingredients': f'{eggs.id},{flour.id}',
+            'ingredients_mode': 'all',
+        })
+
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']],
+            [recipe1.id]
+        )
+
+    def test_filter_recipes_invalid_mode(self):
+        '''Test: an unknown match mode is rejected'''
+        tag = sample_tag(user=self.user)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'tags': tag.id, 'tags_mode': 'some'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags_mode', res.data)
+
+    def test_order_recipes_by_matched_ingredients(self):
+        '''Test: recipes using more of the given ingredients come first'''
+        pantry = create_ingredients(self.user, 200)
+        recipe1 = sample_recipe(user=self.user, title='Two')
+        recipe1.ingredients.add(*pantry[:2])
+        recipe2 = sample_recipe(user=self.user, title='Three')
+        recipe2.ingredients.add(*pantry[2:5])
+        recipe3 = sample_recipe(user=self.user, title='One')
+        recipe3.ingredients.add(pantry[5])
+
+        res = self.client.get(RECIPES_URL, {
+            'ingredients': ','.join(str(item.id) for item in pantry),
+            'ordering': '-matched_ingredients',
+            'page_size': 2,
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [recipe['title'] for recipe in res.data['results']],
+            ['Three', 'Two']
+        )
+        res = self.client.get(res.data['next'])
+        self.assertEqual(
+            [recipe['title'] for recipe in res.data['results']],
+            ['One']
+        )
@@ -0,0 +1,119 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Tag
+from recipe.factories import create_recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+class RecipeSearchApiTests(TestCase):
+    '''Test searching recipes with the q parameter'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'example@example.com',
+            'django123!'
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, text):
+        '''Return the titles of the recipes matching text'''
+        res = self.client.get(RECIPES_URL, {'q': text})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [recipe['title'] for recipe in res.data['results']]
+
+    def test_search_title(self):
+        '''Test: searching recipes by words of the title'''
+        create_recipe(self.user, title='Thai Green Curry')
+        create_recipe(self.user, title='Pancakes')
+
+        self.assertEqual(self.search('curry'), ['Thai Green Curry'])
+
+    def test_search_tag_and_ingredient_names(self):
+        '''Test: tag and ingredient names are searchable'''
+        recipe1 = create_recipe(self.user, title='Porridge')
+        recipe1.tags.add(Tag.objects.create(user=self.user, name='Breakfast'))
+        recipe2 = create_recipe(self.user, title='Soup')
+        recipe2.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Leek')
+        )
+
+        self.assertEqual(self.search('breakfast'), ['Porridge'])
+        self.assertEqual(self.search('leek'), ['Soup'])
+
+    def test_search_requires_every_word(self):
+        '''Test: every word of the search has to match'''
+        recipe = create_recipe(self.user, title='Tomato Soup')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        create_recipe(self.user, title='Tomato Salad')
+
+        self.assertEqual(self.search('tomato vegan'), ['Tomato Soup'])
+
+    def test_search_limited_to_user(self):
+        '''Test: other users' recipes are not found'''
+        other_user = get_user_model().objects.create_user(
+            'other-user@example.com',
+            'django321!'
+        )
+        create_recipe(other_user, title='Secret Curry')
+
+        self.assertEqual(self.search('curry'), [])
+
+    def test_search_follows_renamed_tag(self):
+        '''Test: renaming or deleting a tag updates the search'''
+        recipe = create_recipe(self.user, title='Stew')
+        tag = Tag.objects.create(user=self.user, name='Winter')
+        recipe.tags.add(tag)
+
+        tag.name = 'Autumn'
+        tag.save()
+        self.assertEqual(self.search('winter'), [])
+        self.assertEqual(self.search('autumn'), ['Stew'])
+
+        tag.delete()
+        self.assertEqual(self.search('autumn'), [])
+
+    def test_search_follows_cleared_relations(self):
+        '''Test: clearing a tag from its recipes updates the search'''
+        recipe = create_recipe(self.user, title='Stew')
+        tag = Tag.objects.create(user=self.user, name='Winter')
+        recipe.tags.add(tag)
+
+        tag.recipe_set.clear()
+
+        self.assertEqual(self.search('winter'), [])
+
+    def test_search_bulk_created_recipes(self):
+        '''Test: recipes created in bulk are searchable'''
+        tag = Tag.objects.create(user=self.user, name='Quick')
+        payload = [
+            {'title': 'Omelette', 'time_minutes': 5, 'price': '2.00',
+             'tags': [tag.id]},
+        ]
+
+        self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(self.search('quick omelette'), ['Omelette'])
+
+    def test_search_with_tag_filter(self):
+        '''Test: the search combines with the tag filter'''
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        recipe = create_recipe(self.user, title='Bean Chili')
+        recipe.tags.add(tag)
+        create_recipe(self.user, title='Bean Salad')
+
+        res = self.client.get(RECIPES_URL, {'q': 'bean', 'tags': tag.id})
+
+        self.assertEqual(
+            [recipe['title'] for recipe in res.data['results']],
+            ['Bean Chili']
+        )
@@ -0,0 +1,276 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.journal import compact_changes
+from core.models import ChangeLog, Ingredient, Tag
+from recipe.sync import encode_token
+from recipe.factories import create_recipe
+
+
+SYNC_URL = reverse('recipe:sync')
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+class PublicSyncApiTests(TestCase):
+    '''Test unauthenticated sync API access'''
+
+    def test_authentication_required(self):
+        '''Test: authentication is required for syncing'''
+        res = APIClient().get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(SYNC_COMMIT_WINDOW=0)
+class PrivateSyncApiTests(TestCase):
+    '''Test the delta sync API'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'example@example.com',
+            'django123!'
+        )
+        self.other_user = get_user_model().objects.create_user(
+            'other-user@example.com',
+            'django321!'
+        )
+        self.client.force_authenticate(self.user)
+
+    def sync(self, token=None):
+        params = {'since': token} if token else {}
+        res = self.client.get(SYNC_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res.data
+
+    def test_full_snapshot(self):
+        '''Test: without a token every own object is returned'''
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = create_recipe(self.user)
+        recipe.tags.add(tag)
+        create_recipe(self.other_user)
+
+        data = self.sync()
+
+        self.assertTrue(data['full'])
+        self.assertEqual(
+            [row['id'] for row in data['recipes']['changed']], [recipe.id]
+        )
+        self.assertEqual(data['recipes']['changed'][0]['tags'], [tag.id])
+        self.assertEqual(
+            data['tags']['changed'], [{'id': tag.id, 'name': 'Vegan'}]
+        )
+        self.assertEqual(data['ingredients'], {'changed': [], 'deleted': []})
+
+    def test_no_changes(self):
+        '''Test: nothing is returned when nothing changed'''
+        create_recipe(self.user)
+        token = self.sync()['token']
+
+        data = self.sync(token)
+
+        self.assertFalse(data['full'])
+        for name in ('recipes', 'tags', 'ingredients'):
+            self.assertEqual(data[name], {'changed': [], 'deleted': []})
+
+    def test_changes_since_token(self):
+        '''Test: only objects saved after the token are returned'''
+        unchanged = create_recipe(self.user, title='Old')
+        changed = create_recipe(self.user, title='Before')
+        token = self.sync()['token']
+
+        changed.title = 'After'
+        changed.save()
+        new = Ingredient.objects.create(user=self.user, name='Salt')
+        create_recipe(self.other_user)
+        data = self.sync(token)
+
+        self.assertEqual(
+            [row['title'] for row in data['recipes']['changed']], ['After']
+        )
+        self.assertNotEqual(changed.id, unchanged.id)
+        self.assertEqual(
+            data['ingredients']['changed'], [{'id': new.id, 'name': 'Salt'}]
+        )
+
+    def test_deletes_are_tombstones(self):
+        '''Test: deleted objects are reported by ID'''
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ids = recipe.id, tag.id
+        token = self.sync()['token']
+
+        recipe.delete()
+        tag.delete()
+        data = self.sync(token)
+
+        self.assertEqual(data['recipes']['deleted'], [ids[0]])
+        self.assertEqual(data['tags']['deleted'], [ids[1]])
+        self.assertEqual(data['recipes']['changed'], [])
+
+    def test_created_then_deleted(self):
+        '''Test: an object created and deleted since is only a tombstone'''
+        token = self.sync()['token']
+        recipe = create_recipe(self.user)
+        recipe_id = recipe.id
+        recipe.delete()
+
+        data = self.sync(token)
+
+        self.assertEqual(data['recipes'], {
+            'changed': [], 'deleted': [recipe_id]
+        })
+
+    def test_relation_changes(self):
+        '''Test: recipes whose tags change are returned'''
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        token = self.sync()['token']
+
+        tag.delete()
+        data = self.sync(token)
+
+        self.assertEqual(data['recipes']['changed'][0]['id'], recipe.id)
+        self.assertEqual(data['recipes']['changed'][0]['tags'], [])
+
+    def test_reverse_clear(self):
+        '''Test: clearing a tag from its recipes journals the recipes'''
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        token = self.sync()['token']
+
+        tag.recipe_set.clear()
+        data = self.sync(token)
+
+        self.assertEqual(
+            [row['id'] for row in data['recipes']['changed']], [recipe.id]
+        )
+
+    def test_bulk_changes_journalled(self):
+        '''Test: bulk created, updated and deleted recipes are synced'''
+        token = self.sync()['token']
+        res = self.client.post(BULK_URL, [
+            {'title': 'One', 'time_minutes': 1, 'price': '1.00'},
+            {'title': 'Two', 'time_minutes': 2, 'price': '2.00'},
+        ], format='json')
+        ids = [recipe['id'] for recipe in res.data]
+
+        created = self.sync(token)
+        token = created['token']
+        self.client.patch(
+            BULK_URL, [{'id': ids[0], 'title': 'Uno'}], format='json'
+        )
+        updated = self.sync(token)
+        token = updated['token']
+        self.client.delete(BULK_URL, [ids[1]], format='json')
+        deleted = self.sync(token)
+
+        self.assertEqual(
+            [row['id'] for row in created['recipes']['changed']], ids
+        )
+        self.assertEqual(
+            [row['title'] for row in updated['recipes']['changed']], ['Uno']
+        )
+        self.assertEqual(deleted['recipes']['deleted'], [ids[1]])
+
+    def test_expired_token_gets_snapshot(self):
+        '''Test: a token older than the retention gets a full snapshot'''
+        recipe = create_recipe(self.user)
+        old = timezone.now() - timedelta(days=31)
+
+        with self.settings(SYNC_RETENTION_DAYS=30):
+            data = self.sync(encode_token(0, old.timestamp()))
+
+        self.assertTrue(data['full'])
+        self.assertEqual(data['recipes']['changed'][0]['id'], recipe.id)
+
+    def test_late_commit_not_missed(self):
+        '''Test: a change committed after a newer one is still synced'''
+        late = create_recipe(self.user, title='Late')
+        # Still in flight: its journal row has an ID but is not visible
+        row = ChangeLog.objects.get(kind=ChangeLog.RECIPE, object_id=late.id)
+        row_id = row.id
+        row.delete()
+        create_recipe(self.user, title='Committed')
+
+        with self.settings(SYNC_COMMIT_WINDOW=60):
+            token = self.sync()['token']
+            row.id = row_id
+            row.save()
+            data = self.sync(token)
+
+        self.assertIn(
+            'Late', [item['title'] for item in data['recipes']['changed']]
+        )
+
+    def test_token_settles_after_window(self):
+        '''Test: changes older than the commit window are not resent'''
+        create_recipe(self.user)
+        later = timezone.now() + timedelta(seconds=61)
+
+        with self.settings(SYNC_COMMIT_WINDOW=60):
+            resent = self.sync(self.sync()['token'])
+            with patch('recipe.sync.timezone.now', return_value=later):
+                token = self.sync()['token']
+            data = self.sync(token)
+
+        self.assertEqual(len(resent['recipes']['changed']), 1)
+        self.assertEqual(data['recipes']['changed'], [])
+
+    def test_invalid_token(self):
+        '''Test: a malformed token is a bad request'''
+        for token in ('nope', encode_token(1, 2) + '!', 'w6k'):
+            res = self.client.get(SYNC_URL, {'since': token})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('since', res.data)
+
+    def test_compaction_keeps_latest_state(self):
+        '''Test: compaction keeps what tokens still need'''
+        recipe = create_recipe(self.user)
+        token = self.sync()['token']
+        for title in ('One', 'Two', 'Three'):
+            recipe.title = title
+            recipe.save()
+        gone = create_recipe(self.user)
+        gone_id = gone.id
+        gone.delete()
+
+        compact_changes()
+        data = self.sync(token)
+
+        self.assertEqual(
+            ChangeLog.objects.filter(object_id=recipe.id).count(), 1
+        )
+        self.assertEqual(data['recipes']['changed'][0]['title'], 'Three')
+        self.assertEqual(data['recipes']['deleted'], [gone_id])
+
+    def test_compaction_drops_expired_and_orphaned(self):
+        '''Test: entries past retention or of deleted users are dropped'''
+        create_recipe(self.user)
+        create_recipe(self.other_user)
+        self.other_user.delete()
+        later = timezone.now() + timedelta(days=1)
+
+        with patch('core.journal.timezone.now', return_value=later), \
+                self.settings(SYNC_RETENTION_DAYS=2):
+            compact_changes()
+        self.assertEqual(
+            list(ChangeLog.objects.values_list('user_id', flat=True)),
+            [self.user.id]
+        )
+
+        with self.settings(SYNC_RETENTION_DAYS=0):
+            compact_changes()
+        self.assertFalse(ChangeLog.objects.exists())
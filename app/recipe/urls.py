@@ -1,7 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from recipe import views
+from recipe import async_views, views
 
 
 router = DefaultRouter()
@@ -13,4 +13,21 @@ app_name = 'recipe'
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('sync/', views.SyncView.as_view(), name='sync'),
+    path('async/tags/', async_views.tag_list, name='async-tag-list'),
+    path(
+        'async/ingredients/',
+        async_views.ingredient_list,
+        name='async-ingredient-list'
+    ),
+    path(
+        'async/recipes/',
+        async_views.recipe_list,
+        name='async-recipe-list'
+    ),
+    path(
+        'async/recipes/<int:pk>/',
+        async_views.recipe_detail,
+        name='async-recipe-detail'
+    ),
 ]
@@ -1,20 +1,34 @@
+from django.conf import settings
+from django.db.models import Count, Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework import mixins, status, viewsets
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
 
+from core.images import enqueue_image_job
 from core.models import Ingredient, Recipe, Tag
-from recipe import serializers
+from core.search import search_recipes
+from recipe import bulk, serializers, sync
+from recipe.cache import CachedListMixin
+from recipe.conditional import ConditionalGetMixin
+from recipe.pagination import RecipeAttrCursorPagination, \
+                              RecipeCursorPagination
+from recipe.readers import RecipeReadMixin
+from user.authentication import CachedTokenAuthentication
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+class BaseRecipeAttrViewSet(CachedListMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     '''Base viewset for user owned recipe attributes'''
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeAttrCursorPagination
 
     def get_queryset(self):
         '''Return objects for the current authenticated user only'''
@@ -25,13 +39,15 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
         except ValueError:
             assigned_only = False
 
-        queryset = self.queryset
+        queryset = self.queryset.filter(user=self.request.user)
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = queryset.filter(Exists(
+                self.recipe_through.objects.filter(
+                    **{self.recipe_through_column: OuterRef('pk')}
+                )
+            ))
 
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-name').distinct()
+        return queryset.order_by('-name')
 
     def perform_create(self, serializer):
         '''Create a new object'''
@@ -42,37 +58,116 @@ class TagViewSet(BaseRecipeAttrViewSet):
     '''Manage tags in the database'''
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    recipe_through = Recipe.tags.through
+    recipe_through_column = 'tag_id'
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
     '''Manage ingredients in the database'''
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    recipe_through = Recipe.ingredients.through
+    recipe_through_column = 'ingredient_id'
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(CachedListMixin,
+                    ConditionalGetMixin,
+                    RecipeReadMixin,
+                    viewsets.ModelViewSet):
     '''Manage recipes in the database'''
     serializer_class = serializers.RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeCursorPagination
+    MATCH_MODES = ('any', 'all')
+    ORDERINGS = ('-matched_ingredients',)
 
     def _params_to_ints(self, qs):
         '''Converts a list of string IDs to a list of integers'''
         return [int(str_id) for str_id in qs.split(',')]
 
+    def _get_mode(self, name):
+        '''Return the any/all match mode requested for a relation'''
+        mode = self.request.query_params.get(name, 'any')
+        if mode not in self.MATCH_MODES:
+            raise ValidationError({name: [
+                f'Expected one of: {", ".join(self.MATCH_MODES)}.'
+            ]})
+
+        return mode
+
+    def _filter_related(self, queryset, through, column, ids, mode):
+        '''Filter recipes related to any or all of the given IDs
+
+        "all" is one GROUP BY/HAVING over the through table, so the cost
+        does not grow with a join per requested ID.
+        '''
+        matches = through.objects.filter(**{f'{column}__in': ids})
+        if mode == 'all':
+            return queryset.filter(pk__in=matches.values(
+                'recipe_id'
+            ).annotate(
+                matched=Count(column)
+            ).filter(matched=len(set(ids))).values('recipe_id'))
+
+        return queryset.filter(
+            Exists(matches.filter(recipe_id=OuterRef('pk')))
+        )
+
+    def _count_related(self, through, column, ids):
+        '''Subquery counting how many of the IDs each recipe uses'''
+        return Coalesce(Subquery(
+            through.objects.filter(
+                recipe_id=OuterRef('pk'),
+                **{f'{column}__in': ids}
+            ).values('recipe_id').annotate(
+                matched=Count(column)
+            ).values('matched')
+        ), 0)
+
     def get_queryset(self):
         '''Retrieve the recipes for the authenticated user'''
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
+        ordering = self.request.query_params.get('ordering')
+        if ordering and ordering not in self.ORDERINGS:
+            raise ValidationError({'ordering': [
+                f'Expected one of: {", ".join(self.ORDERINGS)}.'
+            ]})
+
         queryset = self.queryset
         if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = self._filter_related(
+                queryset,
+                Recipe.tags.through,
+                'tag_id',
+                self._params_to_ints(tags),
+                self._get_mode('tags_mode')
+            )
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
-        return queryset.filter(user=self.request.user).order_by('-id')
+            queryset = self._filter_related(
+                queryset,
+                Recipe.ingredients.through,
+                'ingredient_id',
+                ingredient_ids,
+                self._get_mode('ingredients_mode')
+            )
+            if ordering == '-matched_ingredients':
+                queryset = queryset.annotate(
+                    matched_ingredients=self._count_related(
+                        Recipe.ingredients.through,
+                        'ingredient_id',
+                        ingredient_ids
+                    )
+                )
+        queryset = queryset.filter(user=self.request.user).order_by('-id')
+        text = self.request.query_params.get('q', '').strip()
+        if text:
+            queryset = search_recipes(queryset, text)
+
+        return queryset
 
     def get_serializer_class(self):
         '''Return the appropriate serializer class'''
@@ -80,6 +175,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return serializers.RecipeDetailSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
+        elif self.action == 'bulk':
+            return serializers.RecipeBulkSerializer
 
         return self.serializer_class
 
@@ -89,7 +186,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
-        '''Upload image to the recipe'''
+        '''Upload image to the recipe and queue its renditions'''
         recipe = self.get_object()
         serializer = self.get_serializer(
             recipe,
@@ -97,13 +194,75 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
         if serializer.is_valid():
-            serializer.save()
+            serializer.save(renditions={})
+            enqueue_image_job(recipe)
             return Response(
                 serializer.data,
-                status=status.HTTP_200_OK
+                status=status.HTTP_202_ACCEPTED
             )
 
         return Response(
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    @action(methods=['POST', 'PATCH', 'DELETE'], detail=False)
+    def bulk(self, request):
+        '''Create, update or delete many recipes in one transaction
+
+        POST takes a list of recipes, PATCH a list of partial recipes with
+        their `id`, DELETE a list of recipe IDs. Errors are reported per
+        item, in request order, and nothing is written unless all pass.
+        '''
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {'non_field_errors': ['Expected a list of items.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > settings.API_BULK_MAX_ITEMS:
+            return Response(
+                {'non_field_errors': [
+                    f'At most {settings.API_BULK_MAX_ITEMS} items allowed.'
+                ]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if request.method == 'DELETE':
+            count, errors = bulk.delete_recipes(request.user, items)
+        elif request.method == 'PATCH':
+            recipes, errors = bulk.update_recipes(request.user, items)
+        else:
+            recipes, errors = bulk.create_recipes(request.user, items)
+
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        if request.method == 'DELETE':
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        serializer = serializers.RecipeSerializer(recipes, many=True)
+
+        return Response(
+            serializer.data,
+            status=(
+                status.HTTP_201_CREATED if request.method == 'POST'
+                else status.HTTP_200_OK
+            )
+        )
+
+
+class SyncView(APIView):
+    '''Return what changed since a sync token, for offline clients
+
+    Every response carries the token to send next time; omit it for a
+    full snapshot.
+    '''
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        return Response(sync.sync_changes(
+            request.user,
+            request.query_params.get('since'),
+            {'request': request}
+        ))
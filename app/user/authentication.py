@@ -0,0 +1,208 @@
+import hmac
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from core.models import AuthToken, TokenRevocation
+
+
+class TTLCache:
+    '''Thread safe in-process LRU cache whose entries expire'''
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        '''Return the value for key, or None if missing or expired'''
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+
+            return value
+
+    def set(self, key, value):
+        '''Store value, evicting the least recently used entry if full'''
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        '''Remove key if present'''
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        '''Remove every entry'''
+        with self._lock:
+            self._data.clear()
+
+
+class RevocationLog:
+    '''Token digests revoked by any process, replayed by the others
+
+    Revoking writes the digests to TokenRevocation. At most every
+    AUTH_REVOCATION_SYNC_INTERVAL seconds each process reads the rows
+    written since its previous look, with an OVERLAP for late commits
+    and clock skew, and evicts those tokens from its local tier. That is
+    one indexed query per interval, whatever the traffic.
+    '''
+    OVERLAP = timedelta(seconds=10)
+
+    def __init__(self):
+        self.since = None
+        self.next_sync = 0
+        self._lock = threading.Lock()
+
+    def publish(self, digests):
+        '''Record digests as revoked for every process'''
+        now = timezone.now()
+        TokenRevocation.objects.bulk_create([
+            TokenRevocation(digest=digest, created_at=now)
+            for digest in digests
+        ])
+        # Older tokens have left every local tier by themselves
+        TokenRevocation.objects.filter(
+            created_at__lt=now - self.OVERLAP - timedelta(
+                seconds=settings.AUTH_TOKEN_CACHE_TTL
+            )
+        ).delete()
+
+    def sync(self, local, key):
+        '''Evict tokens other processes revoked from local'''
+        if time.monotonic() < self.next_sync:
+            return
+        with self._lock:
+            if time.monotonic() < self.next_sync:
+                return
+            self.next_sync = (
+                time.monotonic() + settings.AUTH_REVOCATION_SYNC_INTERVAL
+            )
+            since, self.since = self.since, timezone.now()
+            # Nothing was cached before the first sync
+            if since is None:
+                return
+
+            for digest in TokenRevocation.objects.filter(
+                created_at__gte=since - self.OVERLAP
+            ).values_list('digest', flat=True):
+                local.delete(key(digest))
+
+
+class TokenCache:
+    '''Two tier token digest to (user, token) cache
+
+    The in-process tier answers most requests without any network hop.
+    The optional shared tier (a Django cache alias) lets processes warm
+    each other. Through the revocation log a revoked token leaves every
+    local tier within AUTH_REVOCATION_SYNC_INTERVAL seconds.
+    '''
+
+    def __init__(self):
+        self.local = TTLCache(
+            settings.AUTH_TOKEN_CACHE_SIZE,
+            settings.AUTH_TOKEN_CACHE_TTL
+        )
+        self.revocations = RevocationLog()
+
+    @property
+    def shared(self):
+        alias = settings.AUTH_TOKEN_CACHE_ALIAS
+        return caches[alias] if alias else None
+
+    def _key(self, digest):
+        return f'auth:token:{digest}'
+
+    def get(self, digest):
+        '''Return the cached (user, token) pair or None'''
+        key = self._key(digest)
+        shared = self.shared
+        self.revocations.sync(self.local, self._key)
+        data = self.local.get(key)
+        if data is None and shared is not None:
+            data = shared.get(key)
+            if data is not None:
+                self.local.set(key, data)
+        if data is None:
+            return None
+
+        # Hand every request its own instances, never a shared object
+        return pickle.loads(data)
+
+    def set(self, digest, user_token):
+        '''Cache the (user, token) pair in both tiers'''
+        key = self._key(digest)
+        data = pickle.dumps(user_token)
+        self.local.set(key, data)
+        if self.shared is not None:
+            self.shared.set(key, data, settings.AUTH_TOKEN_CACHE_TTL)
+
+    def revoke(self, digests):
+        '''Drop the tokens from every tier of every process'''
+        digests = list(digests)
+        if not digests:
+            return
+        for digest in digests:
+            self.local.delete(self._key(digest))
+        if self.shared is not None:
+            self.shared.delete_many([self._key(digest) for digest in digests])
+        self.revocations.publish(digests)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    '''Token authentication that caches the token to user lookup
+
+    A cached token costs no query; otherwise the token is found with one
+    query on its indexed prefix. Expiry is checked on every request.
+    '''
+    model = AuthToken
+
+    def authenticate_credentials(self, key):
+        '''Return the cached user and token, loading them on a miss'''
+        digest = AuthToken.hash_key(key)
+        user_token = token_cache.get(digest)
+        if user_token is None:
+            user_token = self.load_credentials(key, digest)
+            token_cache.set(digest, user_token)
+
+        if user_token[1].has_expired():
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+
+        return user_token
+
+    def load_credentials(self, key, digest):
+        '''Return the user and token for key from the database'''
+        tokens = AuthToken.objects.select_related('user').filter(
+            prefix=key[:AuthToken.PREFIX_LENGTH]
+        )
+        for token in tokens:
+            if hmac.compare_digest(token.digest, digest):
+                if not token.user.is_active:
+                    raise exceptions.AuthenticationFailed(
+                        _('User inactive or deleted.')
+                    )
+                return token.user, token
+
+        raise exceptions.AuthenticationFailed(_('Invalid token.'))
@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password
+
+from user.hashing import run_hashing, verify_password
+
+
+class BoundedHashingBackend(ModelBackend):
+    '''ModelBackend that hashes passwords only while holding a slot
+
+    See user.hashing.hashing_slot; a stale hash is upgraded in place.
+    '''
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway so unknown emails take as long as known ones
+            run_hashing(make_password, password)
+            return None
+
+        valid, rehashed = run_hashing(verify_password, password, user.password)
+        if valid and rehashed:
+            user.password = rehashed
+            user.save(update_fields=['password'])
+        if valid and self.user_can_authenticate(user):
+            return user
+
+        return None
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    '''PBKDF2 with the iteration count from PASSWORD_PBKDF2_ITERATIONS
+
+    Hashes made with any other count are rehashed on the next login.
+    '''
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    '''Argon2 with its costs from the PASSWORD_ARGON2_* settings'''
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class BCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+    '''bcrypt with the work factor from PASSWORD_BCRYPT_ROUNDS'''
+
+    @property
+    def rounds(self):
+        return settings.PASSWORD_BCRYPT_ROUNDS
@@ -0,0 +1,77 @@
+import fcntl
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HashingBusy(APIException):
+    '''Every hashing slot stayed taken for PASSWORD_HASH_WAIT seconds'''
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many sign-ins in progress, try again shortly.')
+    default_code = 'hashing_busy'
+    # Sent as Retry-After by DRF's exception handler
+    wait = 1
+
+
+@contextmanager
+def hashing_slot():
+    '''Hold one of the host's PASSWORD_HASH_SLOTS while hashing
+
+    Slots are lock files in PASSWORD_HASH_LOCK_DIR, so the cap holds
+    across every worker process and thread on the host: with one request
+    per worker, a sign-in storm can only occupy that many workers and
+    the others keep serving reads. Each file is opened per attempt and
+    the lock goes with the descriptor, even if the process dies.
+    '''
+    os.makedirs(settings.PASSWORD_HASH_LOCK_DIR, exist_ok=True)
+    deadline = time.monotonic() + settings.PASSWORD_HASH_WAIT
+    while True:
+        for slot in range(settings.PASSWORD_HASH_SLOTS):
+            fd = os.open(
+                os.path.join(settings.PASSWORD_HASH_LOCK_DIR, f'slot-{slot}'),
+                os.O_RDWR | os.O_CREAT, 0o600
+            )
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            try:
+                yield
+            finally:
+                os.close(fd)
+            return
+
+        if time.monotonic() >= deadline:
+            raise HashingBusy()
+        time.sleep(0.01)
+
+
+def run_hashing(func, *args):
+    '''Return func(*args) computed while holding a hashing slot
+
+    Raises HashingBusy rather than queueing without bound.
+    '''
+    with hashing_slot():
+        return func(*args)
+
+
+def verify_password(password, encoded):
+    '''Return whether password matches, and its rehash if it is due
+
+    The rehash is None unless the password is correct and was stored with
+    another hasher than the preferred one or with outdated costs.
+    '''
+    rehashed = []
+    valid = check_password(
+        password, encoded,
+        setter=lambda raw: rehashed.append(make_password(raw))
+    )
+
+    return valid, rehashed[0] if rehashed else None
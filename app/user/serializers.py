@@ -3,6 +3,8 @@ from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import serializers
 
+from core.models import AuthToken
+
 
 class UserSerializer(serializers.ModelSerializer):
     '''Serializer for the user object'''
@@ -23,13 +25,18 @@ class UserSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         '''Update a user, setting the password correctly and return user'''
         password = validated_data.pop('password', None)
-        user = super().update(instance, validated_data)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        update_fields = list(validated_data)
 
         if password:
-            user.set_password(password)
-            user.save()
+            instance.set_password(password)
+            update_fields.append('password')
+
+        # Only the submitted fields, so concurrent changes survive
+        instance.save(update_fields=update_fields)
 
-        return user
+        return instance
 
 
 class AuthTokenSerializer(serializers.Serializer):
@@ -39,6 +46,9 @@ class AuthTokenSerializer(serializers.Serializer):
         style={'input_type': 'password'},
         trim_whitespace=False
     )
+    label = serializers.CharField(
+        max_length=100, required=False, allow_blank=True
+    )
 
     def validate(self, attrs):
         '''Validate and authenticate the user'''
@@ -56,3 +66,12 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs['user'] = user
         return attrs
+
+
+class TokenSerializer(serializers.ModelSerializer):
+    '''Serializer for a user's tokens, never including their keys'''
+
+    class Meta:
+        model = AuthToken
+        fields = ('id', 'label', 'prefix', 'created_at', 'expires_at')
+        read_only_fields = fields
@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import AuthToken
+from user.authentication import token_cache
+
+
+@receiver(post_delete, sender=AuthToken)
+def revoke_deleted_token(sender, instance, **kwargs):
+    '''Stop accepting a token as soon as it is deleted'''
+    token_cache.revoke([instance.digest])
+
+
+@receiver(post_save, sender=get_user_model())
+def revoke_user_tokens(sender, instance, created, **kwargs):
+    '''Drop cached tokens so updates and deactivation apply at once'''
+    if created:
+        return
+    token_cache.revoke(
+        AuthToken.objects.filter(user=instance).values_list(
+            'digest', flat=True
+        )
+    )
@@ -0,0 +1,219 @@
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import AuthToken, TokenRevocation
+from user.authentication import TTLCache, TokenCache, token_cache
+
+
+PROFILE_URL = reverse('user:profile')
+
+
+class TTLCacheTests(TestCase):
+    '''Test the in-process LRU cache with expiry'''
+
+    def test_evicts_least_recently_used(self):
+        '''Test: the least recently used entry is evicted when full'''
+        cache = TTLCache(max_entries=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    @patch('user.authentication.time.monotonic')
+    def test_entries_expire(self, mock_monotonic):
+        '''Test: entries are not returned after their TTL'''
+        cache = TTLCache(max_entries=2, ttl=60)
+        mock_monotonic.return_value = 100
+        cache.set('a', 1)
+
+        mock_monotonic.return_value = 159
+        self.assertEqual(cache.get('a'), 1)
+        mock_monotonic.return_value = 161
+        self.assertIsNone(cache.get('a'))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    '''Test authenticating with a cached token'''
+
+    def setUp(self):
+        token_cache.local.clear()
+        # Syncing with other processes is covered by RevocationLogTests
+        token_cache.revocations.next_sync = time.monotonic() + 60
+        self.user = get_user_model().objects.create_user(
+            email='example@example.com',
+            password='django123!',
+            name='Test User'
+        )
+        self.token, key = AuthToken.objects.create_token(self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+
+    def test_repeat_requests_skip_token_lookup(self):
+        '''Test: a cached token authenticates without any query'''
+        self.client.get(PROFILE_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(PROFILE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_invalid_token_rejected(self):
+        '''Test: an unknown token is rejected and not cached'''
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(PROFILE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIsNone(token_cache.get(AuthToken.hash_key('invalid')))
+
+    def test_deleted_token_rejected(self):
+        '''Test: deleting a token revokes it immediately'''
+        self.client.get(PROFILE_URL)
+
+        self.token.delete()
+        res = self.client.get(PROFILE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        '''Test: deactivating a user revokes cached tokens immediately'''
+        self.client.get(PROFILE_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(PROFILE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_updated_user_not_stale(self):
+        '''Test: user changes are visible on the next request'''
+        self.client.get(PROFILE_URL)
+
+        self.user.name = 'New Name'
+        self.user.save()
+        res = self.client.get(PROFILE_URL)
+
+        self.assertEqual(res.data['name'], 'New Name')
+
+    def test_update_does_not_save_stale_user(self):
+        '''Test: a profile update never writes back a cached user'''
+        self.client.get(PROFILE_URL)
+        # Changed by another process, so this one's cache is not told
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            password='changed', is_active=False
+        )
+
+        res = self.client.patch(PROFILE_URL, {'name': 'B'})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, 'changed')
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(self.user.name, 'Test User')
+
+    def test_update_saves_only_submitted_fields(self):
+        '''Test: a profile update keeps concurrent changes to other fields'''
+        self.client.get(PROFILE_URL)
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            password='changed'
+        )
+
+        res = self.client.patch(PROFILE_URL, {'name': 'B'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, 'changed')
+        self.assertEqual(self.user.name, 'B')
+
+    def test_shared_tier_warms_local_tier(self):
+        '''Test: a token cached by another process needs no query'''
+        self.client.get(PROFILE_URL)
+
+        with self.settings(AUTH_TOKEN_CACHE_ALIAS='default'):
+            token_cache.local.clear()
+            self.client.get(PROFILE_URL)
+            token_cache.local.clear()
+
+            with self.assertNumQueries(0):
+                res = self.client.get(PROFILE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_uncached_token_one_query(self):
+        '''Test: an uncached token is found with a single query'''
+        with self.assertNumQueries(1):
+            res = self.client.get(PROFILE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_expired_token_rejected(self):
+        '''Test: a cached token stops working once it expires'''
+        self.client.get(PROFILE_URL)
+
+        later = self.token.expires_at + timedelta(seconds=1)
+        with patch('core.models.timezone.now', return_value=later):
+            res = self.client.get(PROFILE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(AUTH_REVOCATION_SYNC_INTERVAL=0)
+class RevocationLogTests(TestCase):
+    '''Test revocations reaching the local tier of other processes'''
+
+    def setUp(self):
+        self.cache = TokenCache()
+        self.other = TokenCache()
+        self.cache.set('a', ('user', 'token'))
+        self.cache.set('b', ('user', 'token'))
+        # The first read starts following the log
+        self.cache.get('a')
+
+    def test_replays_revocations(self):
+        '''Test: tokens another process revoked are evicted locally'''
+        self.other.revoke(['a'])
+
+        with self.assertNumQueries(1):
+            self.assertIsNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.local.get('auth:token:b'))
+
+    def test_late_commit_replayed(self):
+        '''Test: a revocation committed after the last sync is not missed'''
+        TokenRevocation.objects.create(
+            digest='a', created_at=timezone.now() - timedelta(seconds=5)
+        )
+
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_no_sync_before_interval(self):
+        '''Test: the log is read at most once per interval'''
+        self.cache.revocations.next_sync = time.monotonic() + 60
+        self.other.revoke(['a'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cache.get('a'), ('user', 'token'))
+
+    def test_old_revocations_pruned(self):
+        '''Test: revocations older than the cache TTL are deleted'''
+        old = TokenRevocation.objects.create(
+            digest='old', created_at=timezone.now() - timedelta(hours=1)
+        )
+
+        self.other.revoke(['a'])
+
+        self.assertFalse(TokenRevocation.objects.filter(pk=old.pk).exists())
+        self.assertTrue(TokenRevocation.objects.filter(digest='a').exists())
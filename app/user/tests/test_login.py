@@ -0,0 +1,230 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+TOKEN_URL = reverse('user:token')
+
+PASSWORD = 'django123!'
+
+PBKDF2_HASHERS = [
+    'user.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+]
+
+
+def clear_throttles():
+    caches[settings.LOGIN_THROTTLE_CACHE].clear()
+
+
+@override_settings(PASSWORD_HASHERS=PBKDF2_HASHERS,
+                   PASSWORD_PBKDF2_ITERATIONS=1000)
+class PasswordUpgradeTests(TestCase):
+    '''Test: stored hashes are upgraded when users sign in'''
+
+    def setUp(self):
+        clear_throttles()
+        self.addCleanup(clear_throttles)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'example@example.com', PASSWORD
+        )
+
+    def sign_in(self, password=PASSWORD):
+        return self.client.post(TOKEN_URL, {
+            'email': 'example@example.com', 'password': password
+        })
+
+    def test_configured_cost(self):
+        '''Test: new hashes use the configured iteration count'''
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+
+    def test_rehash_outdated_cost(self):
+        '''Test: signing in rehashes with a changed iteration count'''
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            res = self.sign_in()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+        self.assertTrue(self.user.check_password(PASSWORD))
+
+    def test_rehash_other_hasher(self):
+        '''Test: signing in moves a legacy hash to the preferred hasher'''
+        self.user.password = make_password(PASSWORD, hasher='md5')
+        self.user.save()
+
+        res = self.sign_in()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+
+    def test_wrong_password_not_rehashed(self):
+        '''Test: a failed sign-in leaves the stored hash alone'''
+        stored = make_password(PASSWORD, hasher='md5')
+        self.user.password = stored
+        self.user.save()
+
+        res = self.sign_in('wrong_password!')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, stored)
+
+
+class HashingSlotTests(TestCase):
+    '''Test: sign-ins are capped across worker processes'''
+
+    def setUp(self):
+        clear_throttles()
+        self.addCleanup(clear_throttles)
+        lock_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, lock_dir)
+        overrides = self.settings(
+            PASSWORD_HASH_LOCK_DIR=lock_dir, PASSWORD_HASH_SLOTS=1,
+            PASSWORD_HASH_WAIT=0
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.slot = os.path.join(lock_dir, 'slot-0')
+        self.client = APIClient()
+        get_user_model().objects.create_user('example@example.com', PASSWORD)
+
+    def sign_in(self):
+        return self.client.post(TOKEN_URL, {
+            'email': 'example@example.com', 'password': PASSWORD
+        })
+
+    def test_slot_released(self):
+        '''Test: a finished sign-in frees its slot for the next one'''
+        self.assertEqual(self.sign_in().status_code, status.HTTP_200_OK)
+        self.assertEqual(self.sign_in().status_code, status.HTTP_200_OK)
+
+    def test_slot_held_by_other_process(self):
+        '''Test: sign-ins are refused while other workers use every slot'''
+        holder = subprocess.Popen([
+            sys.executable, '-c',
+            'import fcntl, sys, time\n'
+            f'f = open({self.slot!r}, "a")\n'
+            'fcntl.flock(f, fcntl.LOCK_EX)\n'
+            'print("locked", flush=True)\n'
+            'time.sleep(60)\n'
+        ], stdout=subprocess.PIPE, text=True)
+        self.addCleanup(holder.wait)
+        self.addCleanup(holder.kill)
+        self.assertEqual(holder.stdout.readline().strip(), 'locked')
+
+        with patch('user.backends.verify_password') as verify:
+            res = self.sign_in()
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '1')
+        verify.assert_not_called()
+
+        holder.kill()
+        holder.wait()
+        holder.stdout.close()
+        self.assertEqual(self.sign_in().status_code, status.HTTP_200_OK)
+
+
+@override_settings(LOGIN_THROTTLE_IP=(4, 1), LOGIN_THROTTLE_EMAIL=(2, 0.5))
+class LoginThrottleTests(TestCase):
+    '''Test: sign-in bursts are rejected per IP and per email'''
+
+    def setUp(self):
+        clear_throttles()
+        self.addCleanup(clear_throttles)
+        self.client = APIClient()
+
+    def sign_in(self, email='example@example.com'):
+        return self.client.post(TOKEN_URL, {
+            'email': email, 'password': PASSWORD
+        })
+
+    def test_email_burst(self):
+        '''Test: an email is throttled past its burst without hashing'''
+        self.sign_in()
+        self.sign_in()
+
+        with patch('user.backends.run_hashing') as run_hashing:
+            res = self.sign_in('EXAMPLE@example.com ')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '2')
+        run_hashing.assert_not_called()
+        self.assertEqual(
+            self.sign_in('other@example.com').status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+    def test_ip_burst(self):
+        '''Test: a client is throttled past its burst across emails'''
+        for i in range(4):
+            self.assertEqual(
+                self.sign_in(f'user{i}@example.com').status_code,
+                status.HTTP_400_BAD_REQUEST
+            )
+
+        res = self.sign_in('user4@example.com')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_forwarded_for_ignored(self):
+        '''Test: a spoofed X-Forwarded-For does not dodge the IP bucket'''
+        for i in range(4):
+            self.client.post(TOKEN_URL, {
+                'email': f'user{i}@example.com', 'password': PASSWORD
+            }, HTTP_X_FORWARDED_FOR=f'10.0.0.{i}')
+
+        res = self.client.post(TOKEN_URL, {
+            'email': 'user4@example.com', 'password': PASSWORD
+        }, HTTP_X_FORWARDED_FOR='10.0.0.4')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_non_object_body(self):
+        '''Test: a JSON body that is not an object is a bad request'''
+        res = self.client.post(TOKEN_URL, [1, 2], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_buckets_shared_between_processes(self):
+        '''Test: the default throttle cache is shared by worker processes'''
+        self.sign_in()
+        self.sign_in()
+        # Another backend instance on the store stands in for a worker
+        other = FileBasedCache(settings.CACHES['throttle']['LOCATION'], {})
+
+        with patch('user.throttles.caches', {'throttle': other}):
+            res = self.sign_in()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_refill(self):
+        '''Test: the bucket refills at the configured rate'''
+        with patch('user.throttles.time.time', return_value=1000.0):
+            self.sign_in()
+            self.sign_in()
+            throttled = self.sign_in()
+        with patch('user.throttles.time.time', return_value=1002.0):
+            res = self.sign_in()
+
+        self.assertEqual(
+            throttled.status_code, status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,152 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import AuthToken
+from user.authentication import token_cache
+
+
+TOKEN_URL = reverse('user:token')
+TOKENS_URL = reverse('user:tokens')
+PROFILE_URL = reverse('user:profile')
+
+PASSWORD = 'django123!'
+
+
+def detail_url(token_id):
+    return reverse('user:token-detail', args=[token_id])
+
+
+class TokenLifecycleTests(TestCase):
+    '''Test: per-device tokens that expire and can be revoked'''
+
+    def setUp(self):
+        caches[settings.LOGIN_THROTTLE_CACHE].clear()
+        self.addCleanup(caches[settings.LOGIN_THROTTLE_CACHE].clear)
+        token_cache.local.clear()
+        self.user = get_user_model().objects.create_user(
+            'example@example.com', PASSWORD
+        )
+        self.client = APIClient()
+
+    def sign_in(self, label=''):
+        res = self.client.post(TOKEN_URL, {
+            'email': 'example@example.com',
+            'password': PASSWORD,
+            'label': label,
+        })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res.data
+
+    def get_profile(self, key):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+        res = self.client.get(PROFILE_URL)
+        self.client.credentials()
+
+        return res
+
+    def test_token_per_device(self):
+        '''Test: each sign-in gets its own labelled, expiring token'''
+        phone = self.sign_in('Phone')
+        laptop = self.sign_in('Laptop')
+
+        self.assertNotEqual(phone['token'], laptop['token'])
+        self.assertEqual(phone['label'], 'Phone')
+        self.assertEqual(self.get_profile(phone['token']).status_code, 200)
+        self.assertEqual(self.get_profile(laptop['token']).status_code, 200)
+        token = AuthToken.objects.get(pk=phone['id'])
+        self.assertEqual(
+            round((token.expires_at - token.created_at).total_seconds()),
+            settings.AUTH_TOKEN_TTL
+        )
+
+    def test_only_hash_stored(self):
+        '''Test: the key is stored as a digest with an indexed prefix'''
+        key = self.sign_in()['token']
+
+        token = AuthToken.objects.get(user=self.user)
+        self.assertEqual(token.prefix, key[:AuthToken.PREFIX_LENGTH])
+        self.assertEqual(token.digest, AuthToken.hash_key(key))
+        self.assertNotIn(key, [token.prefix, token.digest])
+
+    def test_no_expiry(self):
+        '''Test: a TTL of 0 creates tokens that never expire'''
+        with self.settings(AUTH_TOKEN_TTL=0):
+            data = self.sign_in()
+
+        self.assertIsNone(data['expires_at'])
+
+    def test_oldest_tokens_pruned(self):
+        '''Test: a user keeps at most AUTH_TOKEN_MAX_PER_USER tokens'''
+        with self.settings(AUTH_TOKEN_MAX_PER_USER=2):
+            first = self.sign_in()
+            self.sign_in()
+            self.sign_in()
+
+        self.assertEqual(AuthToken.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(
+            self.get_profile(first['token']).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_expired_tokens_pruned(self):
+        '''Test: signing in deletes the user's expired tokens'''
+        expired, key = AuthToken.objects.create_token(self.user, ttl=60)
+        later = timezone.now() + timedelta(seconds=61)
+
+        with patch('core.models.timezone.now', return_value=later):
+            self.sign_in()
+
+        self.assertFalse(AuthToken.objects.filter(pk=expired.pk).exists())
+
+    def test_list_tokens(self):
+        '''Test: users list their unexpired tokens without keys'''
+        key = self.sign_in('Phone')['token']
+        AuthToken.objects.create_token(self.user, ttl=-1)
+        other = get_user_model().objects.create_user('other@example.com')
+        AuthToken.objects.create_token(other)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+
+        res = self.client.get(TOKENS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([token['label'] for token in res.data], ['Phone'])
+        self.assertNotIn('token', res.data[0])
+        self.assertNotIn('digest', res.data[0])
+
+    def test_revoke_token(self):
+        '''Test: deleting a token revokes it at once'''
+        phone = self.sign_in('Phone')
+        laptop = self.sign_in('Laptop')
+        self.get_profile(phone['token'])
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {laptop["token"]}')
+
+        res = self.client.delete(detail_url(phone['id']))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            self.get_profile(phone['token']).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_revoke_other_users_token(self):
+        '''Test: users cannot revoke tokens of other users'''
+        key = self.sign_in()['token']
+        other = get_user_model().objects.create_user('other@example.com')
+        token, other_key = AuthToken.objects.create_token(other)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+
+        res = self.client.delete(detail_url(token.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue(AuthToken.objects.filter(pk=token.pk).exists())
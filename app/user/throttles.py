@@ -0,0 +1,72 @@
+import hashlib
+import math
+import time
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBucketThrottle(BaseThrottle):
+    '''Throttle allowing bursts, refilled at a steady rate
+
+    `setting` names a (burst, rate) setting: a bucket holds up to burst
+    tokens, refills at rate tokens per second and every allowed request
+    takes one. Subclasses return the bucket key from get_key, or None to
+    let the request through unthrottled.
+    '''
+    setting = None
+    scope = None
+
+    def get_key(self, request):
+        raise NotImplementedError('.get_key() must be overridden')
+
+    def allow_request(self, request, view):
+        key = self.get_key(request)
+        if key is None:
+            return True
+
+        burst, self.rate = getattr(settings, self.setting)
+        cache = caches[settings.LOGIN_THROTTLE_CACHE]
+        cache_key = f'throttle:{self.scope}:{key}'
+        now = time.time()
+        tokens, updated = cache.get(cache_key, (burst, now))
+        self.tokens = min(burst, tokens + (now - updated) * self.rate)
+        if self.tokens < 1:
+            return False
+
+        # Once refilled the bucket is the same as a missing one
+        cache.set(
+            cache_key, (self.tokens - 1, now), math.ceil(burst / self.rate)
+        )
+        return True
+
+    def wait(self):
+        '''Seconds until the bucket holds a token again'''
+        return (1 - self.tokens) / self.rate
+
+
+class LoginIPThrottle(TokenBucketThrottle):
+    '''Throttle sign-in attempts per client IP'''
+    setting = 'LOGIN_THROTTLE_IP'
+    scope = 'login-ip'
+
+    def get_key(self, request):
+        return self.get_ident(request)
+
+
+class LoginEmailThrottle(TokenBucketThrottle):
+    '''Throttle sign-in attempts per email, whatever the client IP'''
+    setting = 'LOGIN_THROTTLE_EMAIL'
+    scope = 'login-email'
+
+    def get_key(self, request):
+        if not isinstance(request.data, Mapping):
+            return None
+        email = request.data.get('email')
+        if not isinstance(email, str) or not email.strip():
+            return None
+
+        # Hashed to keep attacker supplied text out of cache keys
+        return hashlib.sha256(email.strip().lower().encode()).hexdigest()
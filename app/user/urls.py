@@ -9,4 +9,9 @@ urlpatterns = [
     path('create/', views.CreateUserView.as_view(), name='create'),
     path('profile/', views.ManageUserView.as_view(), name='profile'),
     path('token/', views.CreateTokenView.as_view(), name='token'),
+    path('tokens/', views.TokenListView.as_view(), name='tokens'),
+    path(
+        'tokens/<int:pk>/', views.TokenDetailView.as_view(),
+        name='token-detail'
+    ),
 ]
@@ -1,8 +1,17 @@
-from rest_framework import authentication, generics, permissions
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import exceptions, generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
-from user.serializers import AuthTokenSerializer, UserSerializer
+from core.models import AuthToken
+from user.authentication import CachedTokenAuthentication
+from user.serializers import AuthTokenSerializer, TokenSerializer, \
+                             UserSerializer
+from user.throttles import LoginEmailThrottle, LoginIPThrottle
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -14,14 +23,66 @@ class CreateTokenView(ObtainAuthToken):
     '''Create a new auth token for the user'''
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    # Checked before the serializer hashes anything
+    throttle_classes = (LoginIPThrottle, LoginEmailThrottle)
+
+    def post(self, request, *args, **kwargs):
+        '''Create a token for the device signing in and return its key'''
+        serializer = self.serializer_class(
+            data=request.data, context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        token, key = AuthToken.objects.create_token(
+            serializer.validated_data['user'],
+            label=serializer.validated_data.get('label', '')
+        )
+
+        return Response({'token': key, **TokenSerializer(token).data})
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     '''Manage the authenticated user'''
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
-        '''Retrieve and return authenticated user'''
-        return self.request.user
+        '''Retrieve and return authenticated user
+
+        Updates reload the user: the one cached with the token may be
+        stale, and saving it would overwrite newer changes.
+        '''
+        if self.request.method in permissions.SAFE_METHODS:
+            return self.request.user
+
+        user = get_user_model().objects.filter(
+            pk=self.request.user.pk, is_active=True
+        ).first()
+        if user is None:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+
+        return user
+
+
+class TokenListView(generics.ListAPIView):
+    '''List the authenticated user's unexpired tokens'''
+    serializer_class = TokenSerializer
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_queryset(self):
+        return AuthToken.objects.filter(
+            Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now()),
+            user=self.request.user
+        ).order_by('-created_at', '-id')
+
+
+class TokenDetailView(generics.DestroyAPIView):
+    '''Revoke one of the authenticated user's tokens'''
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_queryset(self):
+        return AuthToken.objects.filter(user=self.request.user)